@@ -41,7 +41,7 @@ const ImageGeneration = () => {
         // This ensures the correct path resolution for static assets
         const baseUrl = '/'
         
-        // The backend returns paths like '/temp_images/image_xxx.jpg'
+        // The backend returns paths like '/temp_images/image_xxx.png'
         if (imageUrl.includes('temp_images')) {
           // Remove any leading slash for consistency
           imageUrl = imageUrl.startsWith('/') ? imageUrl.substring(1) : imageUrl
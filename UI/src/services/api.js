@@ -17,6 +17,19 @@ export const generateImage = async (prompt) => {
   }
 }
 
+// Job polling helper
+const JOB_POLL_INTERVAL_MS = 3000
+
+export const waitForJob = async (jobId) => {
+  while (true) {
+    const response = await axios.get(`${API_URL}/jobs/${jobId}`)
+    if (response.data.status === 'completed' || response.data.status === 'failed') {
+      return response.data
+    }
+    await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS))
+  }
+}
+
 // Video Generation API
 export const generateVideo = async (prompt, targetLanguage, story) => {
   try {
@@ -25,7 +38,12 @@ export const generateVideo = async (prompt, targetLanguage, story) => {
       target_language: targetLanguage,
       story
     })
-    return { success: true, data: response.data }
+    // Video generation runs as a background job; poll until it finishes
+    const job = await waitForJob(response.data.job_id)
+    if (job.status === 'failed') {
+      return { success: false, error: job.error || 'Failed to generate video. Please try again.' }
+    }
+    return { success: true, data: job.result }
   } catch (error) {
     console.error('Error generating video:', error)
     return { 
@@ -36,11 +54,13 @@ export const generateVideo = async (prompt, targetLanguage, story) => {
 }
 
 // Video Translation API
-export const translateVideo = async (videoFile, targetLanguage) => {
+export const translateVideo = async (videoFile, targetLanguages) => {
   try {
     const formData = new FormData()
     formData.append('video_file', videoFile)
-    formData.append('target_language', targetLanguage)
+    // One request can translate into several languages; the upload is sent once
+    const languages = Array.isArray(targetLanguages) ? targetLanguages : [targetLanguages]
+    languages.forEach(language => formData.append('target_languages', language))
     
     const response = await axios.post(`${API_URL}/video_translation`, formData, {
       headers: {
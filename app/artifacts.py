@@ -0,0 +1,293 @@
+import os
+import re
+import time
+import shutil
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+from app.cache import CACHE_DIR
+from app.jobs import current_job_id
+from app.metrics import stage
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Artifact storage configuration
+ARTIFACT_ROOT = os.getenv("ARTIFACT_ROOT", os.path.join("UI", "public"))
+ARTIFACT_URL_PREFIX = os.getenv("ARTIFACT_URL_PREFIX", "").rstrip("/")
+ARTIFACT_INDEX_PATH = os.getenv("ARTIFACT_INDEX_PATH", os.path.join(CACHE_DIR, "artifacts.sqlite3"))
+
+# Retention configuration
+ARTIFACT_TTL_HOURS = float(os.getenv("ARTIFACT_TTL_HOURS", "72"))
+ARTIFACT_MAX_MB = int(os.getenv("ARTIFACT_MAX_MB", "20480"))
+ARTIFACT_SWEEP_INTERVAL = float(os.getenv("ARTIFACT_SWEEP_INTERVAL", "600"))
+ORPHAN_GRACE_HOURS = float(os.getenv("ORPHAN_GRACE_HOURS", "6"))
+
+# Directories of the store that hold generated files; the rest of the root (e.g. UI assets) is never touched
+ARTIFACT_DIRS = ("temp_images", "temp_videos", "temp_translations")
+
+# Working files left behind by failed jobs: (parent directory, name pattern)
+WORKING_PATHS = (
+    (".", re.compile(r"video_[0-9a-f]{32}")),          # video generation scene assets
+    (".", re.compile(r"temp_video_[0-9a-f]{32}\.mp4")),  # uploaded videos
+    ("output", re.compile(r"translation_.+")),          # translation intermediates
+)
+
+
+class ArtifactStore:
+    """
+    Single location for every file handed to clients, with a retention policy
+
+    Outputs are written straight into the store and served from there, either by
+    the frontend's static server (the default root is the UI's public directory)
+    or by the backend's ``/artifacts`` static route. Files that already exist
+    elsewhere on the same disk, such as cache entries, are hard-linked in rather
+    than copied.
+
+    Every artifact is recorded in an index with its size, owner (the job that
+    produced it) and last access time. A background sweeper deletes artifacts
+    not accessed within the TTL, evicts the least recently used ones while the
+    store is over its quota, and removes working files abandoned by failed jobs.
+    Only artifacts the application registered are managed; other files under the
+    root, such as sample media committed with the UI, are never deleted.
+    """
+
+    def __init__(self, root: str, url_prefix: str = "", index_path: str = ARTIFACT_INDEX_PATH,
+                 max_bytes: int = ARTIFACT_MAX_MB * 1024 * 1024, ttl_seconds: float = ARTIFACT_TTL_HOURS * 3600):
+        self.root = root
+        self.url_prefix = url_prefix
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.expired = 0
+        self.evictions = 0
+        self.orphans_removed = 0
+        self.last_sweep: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+        os.makedirs(root, exist_ok=True)
+        os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(index_path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            "path TEXT PRIMARY KEY, owner TEXT, size INTEGER, created REAL, last_access REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS artifacts_last_access ON artifacts (last_access)")
+        self._db.commit()
+
+    def path(self, *parts: str) -> str:
+        """Return the store path for an artifact, creating its directory"""
+        path = os.path.join(self.root, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def url(self, path: str) -> str:
+        """Return the public URL of an artifact in the store"""
+        return f"{self.url_prefix}/{self._relative(path)}"
+
+    def link(self, source_path: str, *parts: str, owner: Optional[str] = None) -> str:
+        """
+        Place an existing file in the store without writing its contents again
+
+        Args:
+            source_path: File to publish (e.g. a cache entry)
+            parts: Path of the artifact inside the store
+            owner: Owner recorded in the index (default: the running job)
+
+        Returns:
+            Store path of the artifact
+        """
+        path = self.path(*parts)
+        link_file(source_path, path)
+        self.register(path, owner)
+        return path
+
+    def register(self, path: str, owner: Optional[str] = None):
+        """
+        Record a finished artifact in the index
+
+        Args:
+            path: Store path of the artifact
+            owner: Owner recorded in the index (default: the running job)
+        """
+        owner = owner or current_job_id()
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?)",
+                (self._relative(path), owner, os.path.getsize(path), now, now)
+            )
+            self._db.commit()
+            self._enforce_quota(keep=self._relative(path))
+
+    def touch(self, path: str):
+        """Record an access to an artifact so retention keeps it"""
+        with self._lock:
+            self._db.execute("UPDATE artifacts SET last_access = ? WHERE path = ?",
+                             (time.time(), self._relative(path)))
+            self._db.commit()
+
+    def touch_url(self, url: str):
+        """Record an access to the artifact behind a public URL"""
+        if url.startswith(self.url_prefix + "/"):
+            self.touch(os.path.join(self.root, url[len(self.url_prefix) + 1:]))
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def _delete(self, relative_paths):
+        # Remove files and their index rows; caller holds the lock
+        for relative in relative_paths:
+            try:
+                os.remove(os.path.join(self.root, relative))
+            except OSError:
+                pass
+        self._db.executemany("DELETE FROM artifacts WHERE path = ?", [(relative,) for relative in relative_paths])
+        self._db.commit()
+
+    def _enforce_quota(self, keep: Optional[str] = None):
+        # Evict least recently used artifacts while over the quota; caller holds the lock
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evict = []
+        for relative, size in self._db.execute("SELECT path, size FROM artifacts ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            if relative == keep:
+                continue
+            evict.append(relative)
+            total -= size
+        self._delete(evict)
+        self.evictions += len(evict)
+        if evict:
+            logger.info(f"Evicted {len(evict)} artifacts to stay under the {self.max_bytes} byte quota")
+
+    def _remove_orphans(self, now: float) -> int:
+        # Delete working files of jobs that did not clean up after themselves
+        removed = 0
+        for parent, pattern in WORKING_PATHS:
+            if not os.path.isdir(parent):
+                continue
+            for name in os.listdir(parent):
+                path = os.path.join(parent, name)
+                if not pattern.fullmatch(name) or now - os.path.getmtime(path) < ORPHAN_GRACE_HOURS * 3600:
+                    continue
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+                removed += 1
+        return removed
+
+    def _prune_empty_dirs(self, now: float):
+        # Output directories are created before their files are written, so young ones are kept
+        for directory in ARTIFACT_DIRS:
+            for parent, dirnames, filenames in os.walk(os.path.join(self.root, directory), topdown=False):
+                if parent == os.path.join(self.root, directory) or dirnames or filenames:
+                    continue
+                try:
+                    if now - os.path.getmtime(parent) >= ORPHAN_GRACE_HOURS * 3600:
+                        os.rmdir(parent)
+                except OSError:
+                    pass
+
+    def sweep(self) -> Dict[str, int]:
+        """
+        Apply the retention policy once
+
+        Returns:
+            Counts of expired and evicted artifacts and removed orphaned working files
+        """
+        now = time.time()
+        with self._lock:
+            # Forget artifacts that were deleted behind our back
+            missing = [row[0] for row in self._db.execute("SELECT path FROM artifacts")
+                       if not os.path.exists(os.path.join(self.root, row[0]))]
+            self._db.executemany("DELETE FROM artifacts WHERE path = ?", [(relative,) for relative in missing])
+
+            expired = []
+            if self.ttl_seconds > 0:
+                expired = [row[0] for row in self._db.execute(
+                    "SELECT path FROM artifacts WHERE last_access < ?", (now - self.ttl_seconds,))]
+                self._delete(expired)
+                self.expired += len(expired)
+
+            evictions = self.evictions
+            self._enforce_quota()
+            evicted = self.evictions - evictions
+
+        orphans = self._remove_orphans(now)
+        self.orphans_removed += orphans
+        self._prune_empty_dirs(now)
+        self.last_sweep = now
+        if expired or evicted or orphans:
+            logger.info(f"Artifact sweep removed {len(expired)} expired and {evicted} evicted artifacts "
+                        f"and {orphans} orphaned working files")
+        return {"expired": len(expired), "evicted": evicted, "orphans_removed": orphans}
+
+    def start_sweeper(self, interval: float = ARTIFACT_SWEEP_INTERVAL):
+        """Run the retention sweep in a background thread every ``interval`` seconds"""
+        if self._sweeper is not None or interval <= 0:
+            return
+
+        def run():
+            while not self._stop.is_set():
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.error(f"Error sweeping artifacts: {str(e)}")
+                self._stop.wait(interval)
+
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=run, name="artifact-sweeper", daemon=True)
+        self._sweeper.start()
+        logger.info(f"Artifact sweeper started (every {interval:.0f}s)")
+
+    def stop_sweeper(self):
+        """Stop the background sweeper"""
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return disk usage of the store and the retention counters"""
+        with self._lock:
+            files, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts").fetchone()
+        disk = shutil.disk_usage(self.root)
+        return {
+            "files": files,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "orphans_removed": self.orphans_removed,
+            "last_sweep": self.last_sweep,
+            "disk_free_bytes": disk.free,
+        }
+
+
+def link_file(source_path: str, destination_path: str):
+    """Hard-link a file to a new path, copying only when linking is impossible (e.g. across disks)"""
+    with stage("file_link") as span:
+        if os.path.lexists(destination_path):
+            os.remove(destination_path)
+        try:
+            os.link(source_path, destination_path)
+        except OSError:
+            shutil.copyfile(source_path, destination_path)
+            span.add_bytes(os.path.getsize(destination_path))
+
+
+# Application-wide artifact store
+artifact_store = ArtifactStore(ARTIFACT_ROOT, ARTIFACT_URL_PREFIX)
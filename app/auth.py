@@ -1,63 +1,63 @@
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from datetime import datetime, timedelta
-from typing import Optional
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# JWT Configuration
-SECRET_KEY = os.getenv("SECRET_KEY", "OPENAI-API-KEY")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
-
-# Mock user database - replace with actual database in production
-fake_users_db = {
-    "admin": {
-        "username": "admin",
-        "hashed_password": pwd_context.hash("admin123"),
-        "disabled": False,
-    }
-}
-
-def verify_password(plain_password, hashed_password):
-    """Verify password against hashed version"""
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    """Generate password hash"""
-    return pwd_context.hash(password)
-
-def get_user(db, username: str):
-    """Get user from database"""
-    if username in db:
-        user_dict = db[username]
-        return user_dict
-    return None
-
-def authenticate_user(username: str, password: str):
-    """Authenticate user with username and password"""
-    user = get_user(fake_users_db, username)
-    if not user:
-        return False
-    if not verify_password(password, user["hashed_password"]):
-        return False
-    return user
-
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    """Create JWT access token"""
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError, jwt
+from passlib.context import CryptContext
+from datetime import datetime, timedelta
+from typing import Optional
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# JWT Configuration
+SECRET_KEY = os.getenv("SECRET_KEY", "OPENAI-API-KEY")
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+# Password hashing
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
+
+# Mock user database - replace with actual database in production
+fake_users_db = {
+    "admin": {
+        "username": "admin",
+        "hashed_password": pwd_context.hash("admin123"),
+        "disabled": False,
+    }
+}
+
+def verify_password(plain_password, hashed_password):
+    """Verify password against hashed version"""
+    return pwd_context.verify(plain_password, hashed_password)
+
+def get_password_hash(password):
+    """Generate password hash"""
+    return pwd_context.hash(password)
+
+def get_user(db, username: str):
+    """Get user from database"""
+    if username in db:
+        user_dict = db[username]
+        return user_dict
+    return None
+
+def authenticate_user(username: str, password: str):
+    """Authenticate user with username and password"""
+    user = get_user(fake_users_db, username)
+    if not user:
+        return False
+    if not verify_password(password, user["hashed_password"]):
+        return False
+    return user
+
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    """Create JWT access token"""
+    to_encode = data.copy()
+    if expires_delta:
+        expire = datetime.utcnow() + expires_delta
+    else:
+        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": expire})
+    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return encoded_jwt
@@ -0,0 +1,225 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import logging
+import unicodedata
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Cache configuration
+CACHE_DIR = os.getenv("CACHE_DIR", "cache")
+IMAGE_CACHE_MAX_MB = int(os.getenv("IMAGE_CACHE_MAX_MB", "1024"))
+AUDIO_CACHE_MAX_MB = int(os.getenv("AUDIO_CACHE_MAX_MB", "512"))
+CACHE_TMP_GRACE_HOURS = float(os.getenv("CACHE_TMP_GRACE_HOURS", "1"))
+
+
+def stable_hash(*parts: Any) -> str:
+    """
+    Return a digest of the given values that is stable across processes
+
+    Unlike the built-in ``hash()``, which is salted per process, the same
+    inputs always produce the same digest.
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for use in cache keys (unicode form and whitespace)"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def audio_cache_key(engine: str, text: str, model: Optional[str] = None, voice: Optional[str] = None,
+                    speed: Optional[float] = None, language: Optional[str] = None) -> str:
+    """
+    Build the audio cache key for a synthesized narration segment
+
+    Args:
+        engine: Speech engine (e.g. "openai", "gtts")
+        text: Narration text; normalized so formatting differences share an entry
+        model: Engine model name, if any
+        voice: Voice name, if any
+        speed: Speaking speed, if any
+        language: Language code, if any
+
+    Returns:
+        Cache key
+    """
+    return stable_hash("audio", engine, model, voice, speed, language, normalize_text(text))
+
+
+class DiskCache:
+    """
+    Persistent content-addressed file cache with LRU eviction
+
+    Entries are files named after their key inside ``root``. Entries are written
+    to a temporary file and moved into place atomically, and concurrent requests
+    for the same missing key are coalesced so the producer runs only once.
+    """
+
+    def __init__(self, name: str, root: str, max_bytes: int):
+        self.name = name
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (filename, size)
+        self._size = 0
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        os.makedirs(root, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        # Rebuild the index from disk, oldest access first
+        files = []
+        for filename in os.listdir(self.root):
+            path = os.path.join(self.root, filename)
+            # Temporary files of writes in progress, possibly in another process, are not entries
+            if not os.path.isfile(path) or filename.startswith("."):
+                continue
+            stat = os.stat(path)
+            files.append((stat.st_mtime, filename, stat.st_size))
+        for _, filename, size in sorted(files):
+            key = os.path.splitext(filename)[0]
+            self._entries[key] = (filename, size)
+            self._size += size
+        logger.info(f"{self.name} cache loaded with {len(self._entries)} entries ({self._size} bytes)")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the path of the cached entry for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            path = os.path.join(self.root, entry[0])
+            if not os.path.exists(path):
+                # Removed behind our back
+                self._size -= entry[1]
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        try:
+            # Record the access so LRU order survives restarts
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def get_or_create(self, key: str, ext: str, producer: Callable[[str], None]) -> str:
+        """
+        Return the cached entry for key, producing it on a miss
+
+        Args:
+            key: Cache key (see stable_hash)
+            ext: File extension for the entry (e.g. ".jpg")
+            producer: Callable that writes the entry to the path it is given
+
+        Returns:
+            Path to the cached file
+        """
+        path = self.get(key)
+        if path:
+            return path
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Another thread may have produced the entry while we waited
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is not None:
+                return os.path.join(self.root, entry[0])
+
+            filename = f"{key}{ext}"
+            final_path = os.path.join(self.root, filename)
+            tmp_path = os.path.join(self.root, f".{key}.{uuid.uuid4().hex}{ext}.tmp")
+            try:
+                producer(tmp_path)
+                os.replace(tmp_path, final_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            self._add(key, filename, os.path.getsize(final_path))
+
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return final_path
+
+    def remove_stale_temp_files(self, max_age: float = CACHE_TMP_GRACE_HOURS * 3600) -> int:
+        """
+        Delete temporary files left behind by interrupted writes
+
+        Writes may be in progress in other processes sharing the cache, so only
+        temporary files not modified for ``max_age`` seconds are removed.
+
+        Returns:
+            Number of files removed
+        """
+        removed = 0
+        now = time.time()
+        for filename in os.listdir(self.root):
+            if not (filename.startswith(".") and filename.endswith(".tmp")):
+                continue
+            path = os.path.join(self.root, filename)
+            try:
+                if now - os.path.getmtime(path) >= max_age:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        if removed:
+            logger.info(f"Removed {removed} stale temporary files from the {self.name} cache")
+        return removed
+
+    def _add(self, key: str, filename: str, size: int):
+        with self._lock:
+            self._entries[key] = (filename, size)
+            self._size += size
+            self._evict()
+
+    def _evict(self):
+        # Drop least recently used entries until under the size limit; caller holds the lock
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            key, (filename, size) = self._entries.popitem(last=False)
+            try:
+                os.remove(os.path.join(self.root, filename))
+            except OSError:
+                pass
+            self._size -= size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and size of the cache"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Shared cache of generated images
+image_cache = DiskCache("image", os.path.join(CACHE_DIR, "images"), IMAGE_CACHE_MAX_MB * 1024 * 1024)
+
+# Shared cache of synthesized speech, used by both generation and translation
+audio_cache = DiskCache("audio", os.path.join(CACHE_DIR, "audio"), AUDIO_CACHE_MAX_MB * 1024 * 1024)
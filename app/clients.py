@@ -0,0 +1,169 @@
+import os
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from openai import OpenAI
+from dotenv import load_dotenv
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Connection pool configuration
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "10"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "600"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "60"))
+
+
+class ClientRegistry:
+    """
+    Application-scoped OpenAI and HTTP clients with keep-alive connection pools
+
+    Clients are created on first use (or by ``init`` at startup) and shared by all
+    requests, so TLS handshakes and connection setup are paid once per pooled
+    connection instead of once per request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._openai_http: Optional[httpx.Client] = None
+        self._openai_clients: Dict[str, OpenAI] = {}
+        self._session: Optional[requests.Session] = None
+        self._openai_requests = 0
+
+    def init(self):
+        """Create the shared clients eagerly"""
+        self.http_session()
+        if os.getenv("OPENAI_API_KEY"):
+            self.openai()
+        logger.info("Shared API clients initialized")
+
+    def _count_openai_request(self, request: httpx.Request):
+        with self._lock:
+            self._openai_requests += 1
+
+    def openai_http_client(self) -> httpx.Client:
+        """Return the pooled httpx client used by every OpenAI client"""
+        with self._lock:
+            if self._openai_http is None:
+                self._openai_http = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=OPENAI_MAX_CONNECTIONS,
+                        max_keepalive_connections=OPENAI_MAX_KEEPALIVE
+                    ),
+                    timeout=OPENAI_TIMEOUT,
+                    event_hooks={"request": [self._count_openai_request]}
+                )
+            return self._openai_http
+
+    def openai(self, api_key: Optional[str] = None) -> OpenAI:
+        """
+        Return the shared OpenAI client for an API key
+
+        Args:
+            api_key: Optional OpenAI API key (default: OPENAI_API_KEY)
+
+        Returns:
+            OpenAI client backed by the shared connection pool
+        """
+        api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY environment variable not set")
+        http_client = self.openai_http_client()
+        with self._lock:
+            client = self._openai_clients.get(api_key)
+            if client is None:
+                client = OpenAI(api_key=api_key, http_client=http_client)
+                self._openai_clients[api_key] = client
+            return client
+
+    def http_session(self) -> requests.Session:
+        """Return the pooled requests session used for asset downloads"""
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def download_to(self, url: str, path: str, timeout: Optional[float] = None, chunk_size: int = 1024 * 1024) -> int:
+        """
+        Stream a URL to a file through the shared session without holding the body in memory
+
+        Args:
+            url: URL to fetch
+            path: Destination file
+            timeout: Optional timeout in seconds (default: HTTP_TIMEOUT)
+            chunk_size: Bytes written per chunk
+
+        Returns:
+            Number of bytes written
+        """
+        written = 0
+        with self.http_session().get(url, timeout=timeout or HTTP_TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            with open(path, "wb") as output_file:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    output_file.write(chunk)
+                    written += len(chunk)
+        return written
+
+    def stats(self) -> Dict[str, Any]:
+        """Return connection pool usage, including the connection reuse rate of downloads"""
+        with self._lock:
+            session = self._session
+            openai_http = self._openai_http
+            stats = {
+                "openai": {
+                    "clients": len(self._openai_clients),
+                    "requests": self._openai_requests,
+                    "max_connections": OPENAI_MAX_CONNECTIONS,
+                    "max_keepalive_connections": OPENAI_MAX_KEEPALIVE,
+                },
+                "http": {"pool_size": HTTP_POOL_SIZE, "requests": 0, "connections_opened": 0},
+            }
+        if openai_http is not None:
+            try:
+                stats["openai"]["open_connections"] = len(openai_http._transport._pool.connections)
+            except AttributeError:
+                pass
+        if session is not None:
+            requests_count, connections = 0, 0
+            for adapter in set(session.adapters.values()):
+                try:
+                    pools = list(adapter.poolmanager.pools._container.values())
+                except AttributeError:
+                    continue
+                for pool in pools:
+                    requests_count += pool.num_requests
+                    connections += pool.num_connections
+            stats["http"]["requests"] = requests_count
+            stats["http"]["connections_opened"] = connections
+            stats["http"]["reuse_rate"] = round(1 - connections / requests_count, 3) if requests_count else 0.0
+        return stats
+
+    def close(self):
+        """Close the pooled connections"""
+        with self._lock:
+            if self._openai_http is not None:
+                self._openai_http.close()
+                self._openai_http = None
+            self._openai_clients.clear()
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+# Application-wide client registry
+clients = ClientRegistry()
@@ -1,37 +1,37 @@
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from typing import Optional
-
-from app.auth import SECRET_KEY, ALGORITHM, fake_users_db
-from app.models import TokenData
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
-
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    """Get the current user from the JWT token"""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-        token_data = TokenData(username=username)
-    except JWTError:
-        raise credentials_exception
-    
-    user = fake_users_db.get(token_data.username)
-    if user is None:
-        raise credentials_exception
-    
-    return user
-
-async def get_current_active_user(current_user: dict = Depends(get_current_user)):
-    """Check if the current user is active"""
-    if current_user.get("disabled"):
-        raise HTTPException(status_code=400, detail="Inactive user")
+from fastapi import Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from jose import JWTError, jwt
+from typing import Optional
+
+from app.auth import SECRET_KEY, ALGORITHM, fake_users_db
+from app.models import TokenData
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    """Get the current user from the JWT token"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        username: str = payload.get("sub")
+        if username is None:
+            raise credentials_exception
+        token_data = TokenData(username=username)
+    except JWTError:
+        raise credentials_exception
+    
+    user = fake_users_db.get(token_data.username)
+    if user is None:
+        raise credentials_exception
+    
+    return user
+
+async def get_current_active_user(current_user: dict = Depends(get_current_user)):
+    """Check if the current user is active"""
+    if current_user.get("disabled"):
+        raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
\ No newline at end of file
@@ -0,0 +1,139 @@
+import os
+import asyncio
+import logging
+import functools
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+from app.metrics import bind_context
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Pool sizes
+IO_POOL_SIZE = int(os.getenv("IO_POOL_SIZE", "32"))
+CPU_POOL_SIZE = int(os.getenv("CPU_POOL_SIZE", str(os.cpu_count() or 1)))
+PIPELINE_POOL_SIZE = int(os.getenv("PIPELINE_POOL_SIZE", "4"))
+
+
+class PipelinePoolFullError(Exception):
+    """Raised when a pipeline is started while every pipeline worker is busy"""
+
+
+class Executors:
+    """
+    Bounded pools for work that must not run on the event loop
+
+    Short blocking I/O (SDK calls, downloads, disk and database access) runs in a
+    thread pool. Pipelines that an endpoint awaits for minutes (video
+    translation) run in a separate thread pool, so they never hold the threads
+    that login and uploads wait for; when all of its threads are busy, further
+    pipelines are rejected rather than queued. CPU-bound Python work (MoviePy renders, image
+    scaling) runs in a process pool, so it neither stalls the event loop nor holds
+    the server process's GIL. Worker processes are started with "spawn" so they
+    do not inherit the server's threads and locks. Spawned workers import the
+    functions they run by module name, so those live in ``app.rendering``, which
+    creates no caches, databases or pools on import. With ``cpu_workers`` set to
+    0, CPU-bound work runs in the calling thread instead.
+
+    Both pools are created on first use.
+    """
+
+    def __init__(self, io_workers: int, cpu_workers: int, pipeline_workers: int):
+        self.io_workers = max(1, io_workers)
+        self.cpu_workers = max(0, cpu_workers)
+        self.pipeline_workers = max(1, pipeline_workers)
+        self.pipelines_running = 0
+        self._io: Optional[ThreadPoolExecutor] = None
+        self._cpu: Optional[ProcessPoolExecutor] = None
+        self._pipeline: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def io(self) -> ThreadPoolExecutor:
+        """Return the thread pool for blocking I/O"""
+        with self._lock:
+            if self._io is None:
+                self._io = ThreadPoolExecutor(max_workers=self.io_workers, thread_name_prefix="io")
+            return self._io
+
+    def cpu(self) -> ProcessPoolExecutor:
+        """Return the process pool for CPU-bound work"""
+        with self._lock:
+            if self._cpu is None:
+                self._cpu = ProcessPoolExecutor(max_workers=self.cpu_workers,
+                                                mp_context=multiprocessing.get_context("spawn"))
+                logger.info(f"Started CPU process pool with {self.cpu_workers} workers")
+            return self._cpu
+
+    async def run_io(self, func: Callable, *args, **kwargs) -> Any:
+        """Await a short blocking call in the I/O thread pool, keeping the caller's stage recorder"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.io(), bind_context(functools.partial(func, *args, **kwargs)))
+
+    def pipeline_available(self) -> bool:
+        """Return whether a pipeline worker is free, e.g. to reject a request before reading its upload"""
+        with self._lock:
+            return self.pipelines_running < self.pipeline_workers
+
+    async def run_pipeline(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Await a long blocking pipeline in the pipeline thread pool, keeping the caller's stage recorder
+
+        Raises:
+            PipelinePoolFullError: If every pipeline worker is busy
+        """
+        with self._lock:
+            if self.pipelines_running >= self.pipeline_workers:
+                raise PipelinePoolFullError(
+                    f"All {self.pipeline_workers} pipeline workers are busy, try again later"
+                )
+            self.pipelines_running += 1
+            if self._pipeline is None:
+                self._pipeline = ThreadPoolExecutor(max_workers=self.pipeline_workers, thread_name_prefix="pipeline")
+            pool = self._pipeline
+
+        def release(_):
+            # Freed when the pipeline finishes, even if the awaiting request was cancelled
+            with self._lock:
+                self.pipelines_running -= 1
+
+        future = pool.submit(bind_context(functools.partial(func, *args, **kwargs)))
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    def call_cpu(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a CPU-bound call in the process pool from a worker thread and wait for its result"""
+        if not self.cpu_workers:
+            return func(*args, **kwargs)
+        return self.cpu().submit(func, *args, **kwargs).result()
+
+    def shutdown(self):
+        """Stop all pools, waiting for running work to finish"""
+        with self._lock:
+            pools = (self._io, self._cpu, self._pipeline)
+            self._io = self._cpu = self._pipeline = None
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the pool sizes and the number of running pipelines"""
+        with self._lock:
+            return {
+                "io_workers": self.io_workers,
+                "cpu_workers": self.cpu_workers,
+                "pipeline_workers": self.pipeline_workers,
+                "pipelines_running": self.pipelines_running,
+            }
+
+
+# Application-wide pools
+executors = Executors(IO_POOL_SIZE, CPU_POOL_SIZE, PIPELINE_POOL_SIZE)
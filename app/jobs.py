@@ -0,0 +1,198 @@
+import os
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+from app.metrics import metrics, record_stages
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Job queue configuration
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_DEPTH = int(os.getenv("JOB_QUEUE_DEPTH", "16"))
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "500"))
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+# Job running on the current worker thread
+_current = threading.local()
+
+
+def current_job_id() -> Optional[str]:
+    """Return the ID of the job running on the calling thread, or None outside a job"""
+    return getattr(_current, "job_id", None)
+
+
+class JobQueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at capacity"""
+
+
+class Job:
+    """State of a single background job"""
+
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = JOB_QUEUED
+        self.stage: Optional[str] = None
+        self.progress = 0.0
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.metrics: Optional[Dict[str, Any]] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_COMPLETED, JOB_FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "metrics": self.metrics,
+        }
+
+
+class JobManager:
+    """
+    Runs long pipelines on a bounded worker pool and keeps their state in memory
+
+    Jobs are submitted with a callable that receives a ``progress`` keyword
+    argument: ``progress(stage, fraction)`` updates the job's reported stage and
+    completion fraction (0.0 - 1.0). The callable's return value becomes the
+    job result.
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS, max_queue_depth: int = JOB_QUEUE_DEPTH,
+                 history_size: int = JOB_HISTORY_SIZE):
+        self.max_workers = max_workers
+        self.max_queue_depth = max_queue_depth
+        self.history_size = history_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job-worker")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._queued = 0
+        logger.info(f"Job manager started with {max_workers} workers and queue depth {max_queue_depth}")
+
+    def submit(self, kind: str, func: Callable[..., Dict[str, Any]], *args, **kwargs) -> Job:
+        """
+        Queue a job for execution
+
+        Args:
+            kind: Job type label (e.g. "video_generation")
+            func: Callable running the job; must accept a ``progress`` keyword argument
+            *args, **kwargs: Arguments forwarded to ``func``
+
+        Returns:
+            The queued Job
+
+        Raises:
+            JobQueueFullError: If the number of queued jobs has reached the queue depth
+        """
+        job = Job(kind)
+        with self._lock:
+            if self._queued >= self.max_queue_depth:
+                raise JobQueueFullError(
+                    f"Job queue is full ({self.max_queue_depth} jobs waiting), try again later"
+                )
+            self._queued += 1
+            self._jobs[job.id] = job
+            self._trim_history()
+
+        self._executor.submit(self._run, job, func, args, kwargs)
+        logger.info(f"Queued {kind} job {job.id}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return the job with the given ID, or None if unknown"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        """Return counts of jobs per state along with the pool configuration"""
+        with self._lock:
+            counts = {state: 0 for state in (JOB_QUEUED, JOB_RUNNING, JOB_COMPLETED, JOB_FAILED)}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        counts["workers"] = self.max_workers
+        counts["queue_depth"] = self.max_queue_depth
+        return counts
+
+    def shutdown(self, wait: bool = False):
+        """Stop accepting jobs and release the worker pool"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, job: Job, func: Callable[..., Dict[str, Any]], args: tuple, kwargs: dict):
+        with self._lock:
+            self._queued -= 1
+            job.status = JOB_RUNNING
+            job.started_at = datetime.now()
+
+        def progress(stage: str, fraction: float):
+            with self._lock:
+                job.stage = stage
+                job.progress = max(job.progress, min(fraction, 1.0))
+
+        _current.job_id = job.id
+        recorder = None
+        try:
+            logger.info(f"Running {job.kind} job {job.id}")
+            with record_stages() as recorder:
+                result = func(*args, progress=progress, **kwargs)
+            with self._lock:
+                job.result = result
+                job.progress = 1.0
+                job.stage = "done"
+                job.status = JOB_COMPLETED
+            logger.info(f"Job {job.id} completed")
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {str(e)}")
+            with self._lock:
+                job.error = str(e)
+                job.status = JOB_FAILED
+        finally:
+            _current.job_id = None
+            with self._lock:
+                job.finished_at = datetime.now()
+                job.metrics = recorder.summary() if recorder else None
+            metrics.observe("job_seconds", (job.finished_at - job.started_at).total_seconds(),
+                            "Duration of background jobs", kind=job.kind)
+            metrics.inc("jobs_total", 1, "Finished background jobs by outcome", kind=job.kind, status=job.status)
+
+    def _trim_history(self):
+        # Drop the oldest finished jobs once the history limit is exceeded; caller holds the lock
+        excess = len(self._jobs) - self.history_size
+        if excess <= 0:
+            return
+        for job_id in [j.id for j in self._jobs.values() if j.finished][:excess]:
+            del self._jobs[job_id]
+
+
+# Application-wide job manager
+job_manager = JobManager()
@@ -1,187 +1,444 @@
-from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Form
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi.responses import JSONResponse
-from typing import Optional
-import uvicorn
-import os
-
-from app.dependencies import get_current_user
-from app.models import (
-    Token, 
-    ImageGenerationRequest, 
-    ImageGenerationResponse, 
-    VideoGenerationRequest, 
-    VideoGenerationResponse,
-    VideoTranslationRequest,
-    VideoTranslationResponse
-)
-from app.auth import authenticate_user, create_access_token
-from app.image_gen import ImageModel
-from app.video_gen import generate_story_for_video, ImageModel as VideoImageModel, AudioModel, generate_video
-from app.video_trans import process_video
-
-# Create FastAPI app
-app = FastAPI(
-    title="Rean Foundation Accelerator",
-    description="FastAPI backend for image generation, video generation, and video translation",
-    version="1.0.0",
-)
-
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # For production, specify actual origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# OAuth2 scheme
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
-
-# Login endpoint
-@app.post("/login", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = authenticate_user(form_data.username, form_data.password)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    access_token = create_access_token(data={"sub": user["username"]})
-    return {"access_token": access_token, "token_type": "bearer"}
-
-# Image generation endpoint
-@app.post("/image_generation", response_model=ImageGenerationResponse)
-async def generate_image(
-    request: ImageGenerationRequest,
-    current_user: dict = Depends(get_current_user)
-):
-    try:
-        # Create temporary directory for image
-        dir_name = "temp_images"
-        os.makedirs(dir_name, exist_ok=True)
-        img_name = f"image_{hash(request.prompt)}"
-        
-        # Generate image
-        image_model = ImageModel()
-        image_path = image_model.generate_image_for_video(
-            prompt=request.prompt,
-            dir_name=dir_name,
-            img_name=img_name
-        )
-        
-        # For demo purposes, just return the local path
-        # In production, upload to storage service and return URL
-        # Use the correct file extension (.jpg) and path format for the frontend
-        # The path should be relative to the public directory for proper display in the UI
-        # Ensure the path starts with a forward slash for proper URL resolution in the browser
-        frontend_path = f"/temp_images/{img_name}.jpg"
-        return {"image_url": frontend_path}
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error generating image: {str(e)}"
-        )
-
-# Video generation endpoint
-@app.post("/video_generation", response_model=VideoGenerationResponse)
-async def generate_video_endpoint(
-    request: VideoGenerationRequest,
-    current_user: dict = Depends(get_current_user)
-):
-    try:
-        # Create directory for video assets
-        dir_name = f"video_{hash(request.prompt)}"
-        os.makedirs(dir_name, exist_ok=True)
-        
-        # Generate story based on prompt
-        story = generate_story_for_video(
-            prompt=request.prompt,
-            num_scenes=3,  # Default number of scenes
-            style="informative" if not request.story else None,
-            format="legacy"
-        )
-        
-        # Process each scene
-        image_model = VideoImageModel()
-        audio_model = AudioModel()
-        scenes = []
-        
-        for i, (scene_key, scene_data) in enumerate(story["response"].items(), 1):
-            # Generate image
-            image_model.generate_image_for_video(
-                prompt=scene_data["image_prompt"],
-                dir_name=dir_name,
-                img_name=f"scene_{i}"
-            )
-            
-            # Generate audio with translation if needed
-            if request.target_language and request.target_language != "en":
-                # Here you'd translate the narration first
-                # For simplicity, we're using the original text
-                translated_narration = scene_data["narration"]  # Replace with actual translation
-            else:
-                translated_narration = scene_data["narration"]
-                
-            audio_model.generate_audio_for_video(
-                prompt=translated_narration,
-                dir_name=dir_name,
-                audio_name=f"scene_{i}.mp3"
-            )
-            
-            scenes.append(i)
-        
-        # Combine everything into video
-        video_store = os.path.join("UI", "public", "temp_videos", dir_name)
-        os.makedirs(video_store, exist_ok=True)
-        path = generate_video(video_store, dir_name, scenes)
-        
-        # Return video URL
-        # Use a path relative to the public directory for proper serving by Vite
-        frontend_path = f"/temp_videos/{dir_name}/video.mp4"
-        return {"video_url": frontend_path}
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error generating video: {str(e)}"
-        )
-
-# Video translation endpoint
-@app.post("/video_translation", response_model=VideoTranslationResponse)
-async def translate_video_endpoint(
-    video_file: UploadFile = File(...),
-    target_language: str = Form(...),
-    current_user: dict = Depends(get_current_user)
-):
-    try:
-        # Save the uploaded video
-        dir_name = f"temp_videos_{hash(video_file.filename)}"
-        os.makedirs(dir_name, exist_ok=True)
-        temp_file_path = f"temp_video_{hash(video_file.filename)}.mp4"
-        with open(temp_file_path, "wb") as buffer:
-            content = await video_file.read()
-            buffer.write(content)
-        
-        # Process the video
-        result = process_video(
-            video_path=temp_file_path,
-            target_language=target_language
-        )
-        
-        # Return the frontend paths directly
-        return {
-            "translated_video_url": result["frontend_paths"]["video"],
-            "original_audio": result["frontend_paths"]["original_audio"],
-            "translated_audio": result["frontend_paths"]["translated_audio"]
-        }
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error translating video: {str(e)}"
-        )
-
-if __name__ == "__main__":
+from fastapi import FastAPI, Depends, HTTPException, Request, status, UploadFile, File, Form
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.staticfiles import StaticFiles
+from typing import List, Optional
+import uvicorn
+import os
+import re
+import uuid
+
+from app.dependencies import get_current_user
+from app.models import (
+    Token, 
+    ImageGenerationRequest, 
+    ImageGenerationResponse, 
+    VideoGenerationRequest, 
+    JobSubmissionResponse,
+    JobStatusResponse,
+    ProjectRenderRequest,
+    ProjectResponse,
+    StoryGenerationRequest,
+    StoryResponse,
+    VideoTranslationRequest,
+    VideoTranslationResponse
+)
+from app.auth import authenticate_user, create_access_token
+from app.image_gen import ImageModel
+from app.cache import stable_hash, image_cache, audio_cache
+from app.clients import clients
+from app.artifacts import ARTIFACT_ROOT, artifact_store
+from app.transcription import preload_transcription_backend
+from app.translation import translation_memory
+from app.video_gen import generate_video_from_prompt, generate_story_for_video
+from app.stories import load_story
+from app.jobs import job_manager, JobQueueFullError
+from app.metrics import metrics, record_stages, stage
+from app.media import ffmpeg_manager
+from app.executors import executors, PipelinePoolFullError
+from app.projects import load_project, render_project
+from app.video_trans import process_video_languages
+
+# Create FastAPI app
+app = FastAPI(
+    title="Rean Foundation Accelerator",
+    description="FastAPI backend for image generation, video generation, and video translation",
+    version="1.0.0",
+)
+
+# Add CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # For production, specify actual origins
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Serve generated artifacts from the store (used when ARTIFACT_ROOT is outside the UI's public directory)
+app.mount("/artifacts", StaticFiles(directory=ARTIFACT_ROOT), name="artifacts")
+
+# Upload limits
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "2048"))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_PATHS = {"/video_translation"}
+
+# Language codes such as "es", "hi" or "zh-CN"
+LANGUAGE_CODE_PATTERN = re.compile(r"[A-Za-z]{2,3}(-[A-Za-z0-9]{2,4})?")
+
+# Reject oversized uploads from the Content-Length header before the body is read
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    content_length = request.headers.get("content-length")
+    if (request.url.path in UPLOAD_PATHS and content_length and content_length.isdigit()
+            and int(content_length) > MAX_UPLOAD_MB * 1024 * 1024):
+        return JSONResponse(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            content={"detail": f"Video exceeds the maximum upload size of {MAX_UPLOAD_MB} MB"}
+        )
+    return await call_next(request)
+
+# Record downloads from the artifact route so retention keeps artifacts that are still in use
+@app.middleware("http")
+async def touch_artifacts(request: Request, call_next):
+    response = await call_next(request)
+    if request.url.path.startswith("/artifacts/") and response.status_code == 200:
+        await executors.run_io(artifact_store.touch, os.path.join(ARTIFACT_ROOT, request.url.path[len("/artifacts/"):]))
+    return response
+
+# OAuth2 scheme
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
+
+# Login endpoint
+@app.post("/login", response_model=Token)
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
+    # Password hashing takes a noticeable amount of CPU; bcrypt releases the GIL, so a thread suffices
+    user = await executors.run_io(authenticate_user, form_data.username, form_data.password)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    access_token = create_access_token(data={"sub": user["username"]})
+    return {"access_token": access_token, "token_type": "bearer"}
+
+# Image generation endpoint
+@app.post("/image_generation", response_model=ImageGenerationResponse)
+async def generate_image(
+    request: ImageGenerationRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    try:
+        # Images are published under temp_images in the artifact store
+        dir_name = "temp_images"
+        img_name = f"image_{stable_hash(request.prompt)[:16]}"
+        
+        # Generate image; the SDK call and download block, so they run in the I/O pool
+        image_model = ImageModel()
+        image_url = await executors.run_io(
+            image_model.generate_image_for_video,
+            prompt=request.prompt,
+            dir_name=dir_name,
+            img_name=img_name
+        )
+        
+        return {"image_url": image_url}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error generating image: {str(e)}"
+        )
+
+# Video generation endpoint
+@app.post("/video_generation", response_model=JobSubmissionResponse, status_code=status.HTTP_202_ACCEPTED)
+async def generate_video_endpoint(
+    request: VideoGenerationRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    if not (request.prompt or request.story_id or request.structured_story):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="One of prompt, story_id or structured_story is required"
+        )
+    if request.story_id and await executors.run_io(load_story, request.story_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Story {request.story_id} not found"
+        )
+    
+    # Rendering takes minutes, so queue the pipeline and let the client poll /jobs/{job_id}
+    try:
+        job = job_manager.submit(
+            "video_generation",
+            generate_video_from_prompt,
+            prompt=request.prompt,
+            target_language=request.target_language,
+            story=request.story,
+            story_id=request.story_id,
+            structured_story=request.structured_story.dict() if request.structured_story else None,
+            render_engine=request.render_engine,
+            stream_story=request.stream_story,
+            resolution=request.resolution
+        )
+    except JobQueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    return {"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"}
+
+# Story endpoints
+@app.post("/stories", response_model=StoryResponse)
+async def create_story(
+    request: StoryGenerationRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    # The LLM call blocks, so it runs in the I/O pool
+    try:
+        story = await executors.run_io(
+            generate_story_for_video,
+            prompt=request.prompt,
+            num_scenes=request.num_scenes,
+            style=request.style
+        )
+        return story
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error generating story: {str(e)}"
+        )
+
+@app.get("/stories/{story_id}", response_model=StoryResponse)
+async def get_story(
+    story_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    story = await executors.run_io(load_story, story_id)
+    if story is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Story {story_id} not found"
+        )
+    return story
+
+# Job status endpoint
+@app.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job_status(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job {job_id} not found"
+        )
+    return job.to_dict()
+
+# Project endpoints
+@app.get("/projects/{project_id}", response_model=ProjectResponse)
+async def get_project(
+    project_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    project = await executors.run_io(load_project, project_id)
+    if project is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Project {project_id} not found"
+        )
+    if project.get("video_url"):
+        await executors.run_io(artifact_store.touch_url, project["video_url"])
+    return project
+
+@app.put("/projects/{project_id}", response_model=JobSubmissionResponse, status_code=status.HTTP_202_ACCEPTED)
+async def rerender_project(
+    project_id: str,
+    request: ProjectRenderRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    # Re-render in the background; only scenes whose inputs changed are regenerated
+    if await executors.run_io(load_project, project_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Project {project_id} not found"
+        )
+    try:
+        job = job_manager.submit(
+            "project_render",
+            render_project,
+            project_id,
+            [scene.dict() for scene in request.scenes],
+            target_language=request.target_language,
+            title=request.title,
+            resolution=request.resolution
+        )
+    except JobQueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    return {"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"}
+
+# Upload handling
+async def save_upload(upload: UploadFile, path: str, max_bytes: int) -> int:
+    """
+    Write an uploaded file to disk in fixed-size chunks
+    
+    Args:
+        upload: The uploaded file
+        path: Destination path
+        max_bytes: Maximum accepted size in bytes
+        
+    Returns:
+        Number of bytes written
+    """
+    written = 0
+    try:
+        with open(path, "wb") as buffer:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"Video exceeds the maximum upload size of {max_bytes // (1024 * 1024)} MB"
+                    )
+                await executors.run_io(buffer.write, chunk)
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    return written
+
+def parse_target_languages(target_language: Optional[str], target_languages: Optional[List[str]]) -> List[str]:
+    """Merge the single and repeated language form fields (each may be comma-separated) without duplicates"""
+    languages = []
+    for value in [target_language or ""] + (target_languages or []):
+        for language in value.split(","):
+            language = language.strip()
+            if not language:
+                continue
+            if not LANGUAGE_CODE_PATTERN.fullmatch(language):
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=f"Invalid target language: {language}"
+                )
+            if language not in languages:
+                languages.append(language)
+    if not languages:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="At least one target language is required"
+        )
+    return languages
+
+# Video translation endpoint
+@app.post("/video_translation", response_model=VideoTranslationResponse)
+async def translate_video_endpoint(
+    video_file: UploadFile = File(...),
+    target_language: Optional[str] = Form(None),
+    target_languages: Optional[List[str]] = Form(None),
+    current_user: dict = Depends(get_current_user)
+):
+    languages = parse_target_languages(target_language, target_languages)
+    # Refuse before accepting the upload when every pipeline worker is busy
+    if not executors.pipeline_available():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="All translation workers are busy, try again later"
+        )
+    try:
+        with record_stages() as recorder:
+            # Save the uploaded video without holding it in memory
+            temp_file_path = f"temp_video_{uuid.uuid4().hex}.mp4"
+            with stage("upload") as span:
+                span.add_bytes(await save_upload(video_file, temp_file_path, MAX_UPLOAD_MB * 1024 * 1024))
+            
+            # Extract and transcribe once, then translate into every language in parallel;
+            # the pipeline takes minutes, so it runs in the bounded pipeline pool
+            try:
+                manifest = await executors.run_pipeline(
+                    process_video_languages,
+                    video_path=temp_file_path,
+                    target_languages=languages
+                )
+            except PipelinePoolFullError as e:
+                # The pipeline removes the upload when it runs; it never started
+                os.remove(temp_file_path)
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail=str(e)
+                )
+        
+        translations = {
+            language: {
+                "status": entry["status"],
+                "translated_video_url": entry.get("frontend_paths", {}).get("video"),
+                "translated_audio": entry.get("frontend_paths", {}).get("translated_audio"),
+                "error": entry.get("error")
+            }
+            for language, entry in manifest["languages"].items()
+        }
+        first = translations[languages[0]]
+        
+        # Return the frontend paths directly
+        return {
+            "translated_video_url": first["translated_video_url"],
+            "original_audio": manifest["frontend_paths"]["original_audio"],
+            "translated_audio": first["translated_audio"],
+            "translations": translations,
+            "metrics": recorder.summary()
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error translating video: {str(e)}"
+        )
+
+# Service statistics endpoint
+@app.get("/stats")
+async def get_stats(current_user: dict = Depends(get_current_user)):
+    return await executors.run_io(collect_stats)
+
+def collect_stats() -> dict:
+    """Gather the statistics of every component; some query databases or the disk"""
+    return {
+        "clients": clients.stats(),
+        "caches": {
+            "image": image_cache.stats(),
+            "audio": audio_cache.stats(),
+            "translation_memory": translation_memory.stats(),
+        },
+        "artifacts": artifact_store.stats(),
+        "jobs": job_manager.stats(),
+        "ffmpeg": ffmpeg_manager.stats(),
+        "executors": executors.stats(),
+    }
+
+# Prometheus metrics endpoint
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    await executors.run_io(refresh_gauges)
+    return metrics.render()
+
+def refresh_gauges():
+    """Refresh the point-in-time gauges, done on every scrape"""
+    for state, count in job_manager.stats().items():
+        metrics.set("jobs", count, "Jobs per state and job pool configuration", state=state)
+    for name, cache in (("image", image_cache), ("audio", audio_cache)):
+        cache_stats = cache.stats()
+        metrics.set("cache_bytes", cache_stats["bytes"], "Size of the on-disk caches", cache=name)
+        metrics.set("cache_hits", cache_stats["hits"], "Cache hits since startup", cache=name)
+        metrics.set("cache_misses", cache_stats["misses"], "Cache misses since startup", cache=name)
+    for state, count in ffmpeg_manager.stats().items():
+        metrics.set("ffmpeg_processes", count, "ffmpeg processes per state and the process limit", state=state)
+    artifact_stats = artifact_store.stats()
+    metrics.set("artifact_store_bytes", artifact_stats["bytes"], "Size of the artifact store")
+    metrics.set("artifact_store_files", artifact_stats["files"], "Files in the artifact store")
+    metrics.set("artifact_store_disk_free_bytes", artifact_stats["disk_free_bytes"],
+                "Free space on the artifact store's disk")
+
+@app.on_event("startup")
+def startup_clients():
+    clients.init()
+    preload_transcription_backend()
+    for cache in (image_cache, audio_cache):
+        cache.remove_stale_temp_files()
+    artifact_store.start_sweeper()
+
+@app.on_event("shutdown")
+def shutdown_job_manager():
+    job_manager.shutdown()
+    executors.shutdown()
+    artifact_store.stop_sweeper()
+    clients.close()
+
+if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,356 @@
+import os
+import re
+import json
+import shutil
+import tempfile
+import logging
+import threading
+import subprocess
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# ffmpeg process limits
+FFMPEG_CONCURRENCY = int(os.getenv("FFMPEG_CONCURRENCY", str(os.cpu_count() or 1)))
+FFMPEG_TIMEOUT = float(os.getenv("FFMPEG_TIMEOUT", "3600"))
+FFPROBE_TIMEOUT = float(os.getenv("FFPROBE_TIMEOUT", "60"))
+
+# Clips mixed by one ffmpeg process; larger mixes are done in groups, well below open-file limits
+MIX_GROUP_SIZE = 64
+
+PROGRESS_TIME_PATTERN = re.compile(r"out_time_us=(\d+)")
+SILENCE_START_PATTERN = re.compile(r"silence_start: (-?[\d.]+)")
+SILENCE_END_PATTERN = re.compile(r"silence_end: (-?[\d.]+)")
+
+
+class FFmpegManager:
+    """
+    Runs ffmpeg processes with a global concurrency limit, timeouts and progress reporting
+    
+    Commands are argument lists and never go through a shell. At most
+    ``max_processes`` ffmpeg and ffprobe processes run at once across all jobs
+    and requests; further calls wait for a free slot. A process that outlives its
+    timeout is killed and the files it was writing are removed. When the length
+    of the output is known, ffmpeg's ``-progress`` output is turned into the
+    completed fraction.
+    
+    The interface is blocking on purpose: every caller is a pipeline that already
+    runs off the event loop, on a job worker or in the executors' pipeline pool,
+    so no request handler awaits ffmpeg directly. An awaitable wrapper would
+    only park one more thread per process.
+    """
+    
+    def __init__(self, max_processes: int, default_timeout: float):
+        self.max_processes = max(1, max_processes)
+        self.default_timeout = default_timeout
+        self.running = 0
+        self.waiting = 0
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self._slots = threading.BoundedSemaphore(self.max_processes)
+        self._lock = threading.Lock()
+    
+    def run(self, args: Sequence[str], duration: Optional[float] = None,
+            on_progress: Optional[Callable[[float], None]] = None, timeout: Optional[float] = None,
+            outputs: Sequence[str] = (), capture_output: bool = False) -> subprocess.CompletedProcess:
+        """
+        Run ffmpeg once a process slot is free
+        
+        Args:
+            args: ffmpeg arguments, without the program name
+            duration: Length of the output in seconds, used to compute progress
+            on_progress: Callback receiving the completed fraction (0-1)
+            timeout: Seconds before the process is killed (default: default_timeout, 0 for none)
+            outputs: Files the command writes, removed if it fails or times out
+            capture_output: Return ffmpeg's log output (e.g. for filters that report on it)
+            
+        Returns:
+            CompletedProcess, with the log output in ``stderr`` if captured
+            
+        Raises:
+            subprocess.CalledProcessError: ffmpeg exited with an error
+            subprocess.TimeoutExpired: ffmpeg ran longer than the timeout
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        report = on_progress is not None and bool(duration)
+        command = ["ffmpeg", "-nostdin"]
+        if report:
+            command += ["-progress", "pipe:1", "-nostats"]
+        command += list(args)
+        
+        try:
+            with self._slot():
+                result = self._execute(command, duration if report else None, on_progress, timeout, outputs)
+        except Exception:
+            for path in outputs:
+                if os.path.exists(path):
+                    os.remove(path)
+            raise
+        if not capture_output:
+            result.stderr = None
+        return result
+    
+    def probe(self, args: Sequence[str], timeout: float = FFPROBE_TIMEOUT) -> str:
+        """
+        Run ffprobe once a process slot is free and return its output
+        
+        Args:
+            args: ffprobe arguments, without the program name
+            timeout: Seconds before the process is killed
+            
+        Raises:
+            subprocess.CalledProcessError: ffprobe exited with an error
+            subprocess.TimeoutExpired: ffprobe ran longer than the timeout
+        """
+        command = ["ffprobe", *args]
+        try:
+            with self._slot():
+                return subprocess.run(command, capture_output=True, text=True, check=True, timeout=timeout).stdout
+        except subprocess.TimeoutExpired:
+            with self._lock:
+                self.timeouts += 1
+            logger.error(f"ffprobe killed after {timeout:g}s: {' '.join(command)}")
+            raise
+    
+    @contextmanager
+    def _slot(self):
+        # Wait for a free process slot and count the process's outcome
+        with self._lock:
+            self.waiting += 1
+        self._slots.acquire()
+        with self._lock:
+            self.waiting -= 1
+            self.running += 1
+        try:
+            yield
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        else:
+            with self._lock:
+                self.completed += 1
+        finally:
+            with self._lock:
+                self.running -= 1
+            self._slots.release()
+    
+    def _execute(self, command: List[str], duration: Optional[float], on_progress, timeout: float,
+                 outputs: Sequence[str]) -> subprocess.CompletedProcess:
+        process = subprocess.Popen(
+            command, stdout=subprocess.PIPE if duration else subprocess.DEVNULL,
+            stderr=subprocess.PIPE, text=True, errors="replace"
+        )
+        # Drain the log in the background so a chatty process never blocks on a full pipe
+        stderr = []
+        reader = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)
+        reader.start()
+        timed_out = threading.Event()
+        
+        def kill():
+            timed_out.set()
+            process.kill()
+        
+        timer = threading.Timer(timeout, kill) if timeout > 0 else None
+        if timer is not None:
+            timer.daemon = True
+            timer.start()
+        try:
+            if duration:
+                for line in process.stdout:
+                    match = PROGRESS_TIME_PATTERN.match(line)
+                    if match:
+                        on_progress(min(int(match.group(1)) / 1e6 / duration, 1.0))
+            process.wait()
+            # A killed process may not close its log pipe straight away
+            reader.join(timeout=5 if timed_out.is_set() else None)
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+        
+        log = "".join(stderr)
+        if timed_out.is_set():
+            with self._lock:
+                self.timeouts += 1
+            logger.error(f"ffmpeg killed after {timeout:g}s: {' '.join(command)}")
+            raise subprocess.TimeoutExpired(command, timeout, stderr=log)
+        if process.returncode != 0:
+            logger.error(f"ffmpeg exited with {process.returncode}: {log.strip()[-2000:]}")
+            raise subprocess.CalledProcessError(process.returncode, command, stderr=log)
+        if duration:
+            on_progress(1.0)
+        return subprocess.CompletedProcess(command, 0, stderr=log)
+    
+    def stats(self) -> Dict[str, int]:
+        """Return the process limit and counters of running, waiting and finished processes"""
+        with self._lock:
+            return {
+                "max_processes": self.max_processes,
+                "running": self.running,
+                "waiting": self.waiting,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timeouts": self.timeouts,
+            }
+
+
+# Application-wide ffmpeg process manager
+ffmpeg_manager = FFmpegManager(FFMPEG_CONCURRENCY, FFMPEG_TIMEOUT)
+
+
+def probe_duration(media_path: str) -> float:
+    """Return the duration of a media file in seconds using ffprobe"""
+    output = ffmpeg_manager.probe(
+        ["-v", "error", "-show_entries", "format=duration",
+         "-of", "default=noprint_wrappers=1:nokey=1", media_path]
+    )
+    return float(output.strip())
+
+
+def probe_audio_stream(media_path: str) -> Optional[Dict[str, Any]]:
+    """
+    Describe the first audio stream of a media file using ffprobe
+    
+    Returns:
+        Dictionary with "codec_name", "channels", "sample_rate" and "bit_rate",
+        or None if the file has no audio stream
+    """
+    output = ffmpeg_manager.probe(
+        ["-v", "error", "-select_streams", "a:0",
+         "-show_entries", "stream=codec_name,channels,sample_rate,bit_rate", "-of", "json", media_path]
+    )
+    streams = json.loads(output or "{}").get("streams") or []
+    return streams[0] if streams else None
+
+
+def copy_audio_stream(media_path: str, output_path: str):
+    """Copy the first audio stream of a media file into its own file without re-encoding it"""
+    ffmpeg_manager.run(
+        ["-y", "-loglevel", "error", "-i", media_path, "-map", "0:a:0", "-vn", "-c:a", "copy", output_path],
+        outputs=[output_path]
+    )
+
+
+def detect_silences(media_path: str, noise_db: int = -30, min_silence: float = 0.5) -> List[Tuple[float, float]]:
+    """
+    Find silent stretches in a media file with ffmpeg's silencedetect filter
+
+    Args:
+        media_path: Audio or video file
+        noise_db: Level below which audio counts as silence, in dB
+        min_silence: Minimum length of a silence in seconds
+
+    Returns:
+        List of (start, end) times of the silences in seconds
+    """
+    result = ffmpeg_manager.run(
+        ["-hide_banner", "-nostats", "-i", media_path, "-vn",
+         "-af", f"silencedetect=noise={noise_db}dB:d={min_silence}", "-f", "null", "-"],
+        capture_output=True
+    )
+    starts = [float(value) for value in SILENCE_START_PATTERN.findall(result.stderr)]
+    ends = [float(value) for value in SILENCE_END_PATTERN.findall(result.stderr)]
+    return list(zip(starts, ends))
+
+
+def extract_audio_chunk(media_path: str, start: float, duration: float, output_path: str):
+    """Extract a slice of audio as low-rate mono MP3, enough for speech recognition"""
+    ffmpeg_manager.run(
+        ["-y", "-loglevel", "error", "-ss", f"{start:.3f}", "-t", f"{duration:.3f}",
+         "-i", media_path, "-vn", "-ac", "1", "-ar", "16000", "-b:a", "64k", output_path],
+        outputs=[output_path]
+    )
+
+
+def atempo_filter(tempo: float) -> str:
+    """Return an atempo filter chain for any speed-up factor (a single atempo is limited to 0.5-2.0)"""
+    filters = []
+    while tempo > 2.0:
+        filters.append("atempo=2.0")
+        tempo /= 2.0
+    filters.append(f"atempo={tempo:.4f}")
+    return ",".join(filters)
+
+
+def fit_audio_to_slot(audio_path: str, slot_seconds: float, output_path: str, max_tempo: float = 2.0) -> float:
+    """
+    Fit speech into a time slot, speeding it up when it is longer than the slot
+
+    The audio is sped up by at most ``max_tempo``; anything still beyond the slot
+    is cut so it never overlaps the next slot. The result is written as PCM WAV.
+
+    Returns:
+        The speed-up factor applied (1.0 if the audio already fits)
+    """
+    duration = probe_duration(audio_path)
+    tempo = 1.0
+    filters = []
+    if slot_seconds > 0 and duration > slot_seconds:
+        tempo = min(duration / slot_seconds, max_tempo)
+        filters.append(atempo_filter(tempo))
+    filters.append(f"atrim=0:{max(slot_seconds, 0.01):.3f}")
+    ffmpeg_manager.run(
+        ["-y", "-loglevel", "error", "-i", audio_path, "-af", ",".join(filters),
+         "-ac", "1", "-ar", "44100", "-c:a", "pcm_s16le", output_path],
+        outputs=[output_path]
+    )
+    return tempo
+
+
+def mix_audio_at_offsets(placements: List[Tuple[str, float]], total_duration: float, output_path: str,
+                         group_size: int = MIX_GROUP_SIZE):
+    """
+    Mix audio clips into one track, each starting at its offset
+
+    At most ``group_size`` clips go into one ffmpeg process. Longer lists are
+    mixed group by group into lossless partial tracks, which are then mixed
+    together, so open files and the filter graph stay bounded.
+
+    Args:
+        placements: List of (audio_path, start_seconds)
+        total_duration: Length of the output track; silence fills the gaps
+        output_path: Output audio file
+        group_size: Maximum number of inputs of one ffmpeg process
+    """
+    group_size = max(2, group_size)
+    if len(placements) > group_size:
+        partial_dir = tempfile.mkdtemp(prefix="mix_", dir=os.path.dirname(os.path.abspath(output_path)))
+        try:
+            partials = []
+            for group, start in enumerate(range(0, len(placements), group_size)):
+                partial_path = os.path.join(partial_dir, f"partial_{group}.wav")
+                mix_audio_at_offsets(placements[start:start + group_size], total_duration, partial_path, group_size)
+                partials.append((partial_path, 0.0))
+            mix_audio_at_offsets(partials, total_duration, output_path, group_size)
+        finally:
+            shutil.rmtree(partial_dir, ignore_errors=True)
+        return
+
+    if not placements:
+        ffmpeg_manager.run(
+            ["-y", "-loglevel", "error", "-f", "lavfi", "-i", "anullsrc=r=44100:cl=mono",
+             "-t", f"{total_duration:.3f}", output_path],
+            outputs=[output_path]
+        )
+        return
+
+    command = ["-y", "-loglevel", "error"]
+    filters = []
+    mix_inputs = ""
+    for index, (audio_path, start) in enumerate(placements):
+        command += ["-i", audio_path]
+        filters.append(f"[{index}:a]adelay={int(start * 1000)}[d{index}]")
+        mix_inputs += f"[d{index}]"
+    filters.append(
+        f"{mix_inputs}amix=inputs={len(placements)}:normalize=0:dropout_transition=0,"
+        f"apad,atrim=0:{total_duration:.3f}[out]"
+    )
+    command += ["-filter_complex", ";".join(filters), "-map", "[out]", output_path]
+    ffmpeg_manager.run(command, outputs=[output_path])
@@ -0,0 +1,204 @@
+import time
+import bisect
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Histogram buckets in seconds, from sub-second file operations to multi-minute renders
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, float("inf"))
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(key) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    """
+    In-process counters, gauges and histograms rendered in the Prometheus text format
+
+    Metrics are created on first use and identified by name and labels.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}  # name -> (type, help)
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, list]] = {}  # name -> labels -> [bucket counts, sum, count]
+
+    def _describe(self, name: str, kind: str, help_text: str):
+        self._help.setdefault(name, (kind, help_text))
+
+    def inc(self, name: str, amount: float = 1.0, help_text: str = "", **labels):
+        """Increase a counter"""
+        with self._lock:
+            self._describe(name, "counter", help_text)
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0.0) + amount
+
+    def set(self, name: str, value: float, help_text: str = "", **labels):
+        """Set a gauge"""
+        with self._lock:
+            self._describe(name, "gauge", help_text)
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, help_text: str = "", **labels):
+        """Record a histogram observation"""
+        with self._lock:
+            self._describe(name, "histogram", help_text)
+            series = self._histograms.setdefault(name, {})
+            key = _label_key(labels)
+            entry = series.get(key)
+            if entry is None:
+                entry = series[key] = [[0] * len(LATENCY_BUCKETS), 0.0, 0]
+            entry[0][bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name in sorted(self._help):
+                kind, help_text = self._help[name]
+                if help_text:
+                    lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "histogram":
+                    for key, (buckets, total, count) in sorted(self._histograms.get(name, {}).items()):
+                        cumulative = 0
+                        for bound, bucket_count in zip(LATENCY_BUCKETS, buckets):
+                            cumulative += bucket_count
+                            lines.append(f"{name}_bucket{_format_labels(key, {'le': _format_value(bound)})} {cumulative}")
+                        lines.append(f"{name}_sum{_format_labels(key)} {_format_value(total)}")
+                        lines.append(f"{name}_count{_format_labels(key)} {count}")
+                else:
+                    series = self._counters if kind == "counter" else self._gauges
+                    for key, value in sorted(series.get(name, {}).items()):
+                        lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class StageRecorder:
+    """Per-job summary of the pipeline stages that ran on its behalf"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict[str, float]] = {}
+
+    def record(self, name: str, seconds: float, processed_bytes: int, failed: bool):
+        with self._lock:
+            entry = self._stages.setdefault(
+                name, {"count": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0, "bytes": 0}
+            )
+            entry["count"] += 1
+            entry["errors"] += int(failed)
+            entry["total_seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            entry["bytes"] += processed_bytes
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Return the stages with their call counts, total/max seconds and bytes processed"""
+        with self._lock:
+            return {
+                name: {**entry, "total_seconds": round(entry["total_seconds"], 3),
+                       "max_seconds": round(entry["max_seconds"], 3)}
+                for name, entry in self._stages.items()
+            }
+
+
+class Span:
+    """Handle of a running stage, used to report the bytes it processed"""
+
+    def __init__(self):
+        self.bytes = 0
+
+    def add_bytes(self, count: int):
+        self.bytes += count
+
+
+# Recorder of the job (or request) the current code runs for
+_recorder: contextvars.ContextVar[Optional[StageRecorder]] = contextvars.ContextVar("stage_recorder", default=None)
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Time a pipeline stage
+
+    The duration goes into the ``pipeline_stage_seconds`` histogram, the call into
+    ``pipeline_stage_total`` by outcome, bytes reported through the yielded span
+    into ``pipeline_stage_bytes_total``, and all of it into the running job's
+    per-stage summary.
+    """
+    span = Span()
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield span
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        metrics.observe("pipeline_stage_seconds", seconds, "Latency of pipeline stages", stage=name)
+        metrics.inc("pipeline_stage_total", 1, "Pipeline stage runs by outcome",
+                    stage=name, outcome="error" if failed else "ok")
+        if span.bytes:
+            metrics.inc("pipeline_stage_bytes_total", span.bytes, "Bytes processed by pipeline stages", stage=name)
+        recorder = _recorder.get()
+        if recorder is not None:
+            recorder.record(name, seconds, span.bytes, failed)
+
+
+@contextmanager
+def record_stages():
+    """Collect the stages run inside the block (including bound worker threads) into a StageRecorder"""
+    recorder = StageRecorder()
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+def bind_context(func: Callable) -> Callable:
+    """
+    Wrap a callable so it runs with the caller's stage recorder
+
+    Thread pools do not carry context variables into their workers; wrap
+    functions submitted to a pool so their stages count towards the job.
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+
+    return run
+
+
+# Application-wide metrics registry
+metrics = MetricsRegistry()
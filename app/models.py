@@ -1,57 +1,119 @@
-from pydantic import BaseModel
-from typing import Optional, Dict, Any, List
-
-# Authentication models
-class Token(BaseModel):
-    access_token: str
-    token_type: str
-
-class TokenData(BaseModel):
-    username: Optional[str] = None
-
-class User(BaseModel):
-    username: str
-    disabled: Optional[bool] = None
-
-# Image generation models
-class ImageGenerationRequest(BaseModel):
-    prompt: str
-
-class ImageGenerationResponse(BaseModel):
-    image_url: str
-
-# Video generation models
-class VideoGenerationRequest(BaseModel):
-    prompt: str
-    target_language: str = "en"
-    story: Optional[str] = None
-
-class VideoGenerationResponse(BaseModel):
-    video_url: str
-
-# Video translation models
-class VideoTranslationRequest(BaseModel):
-    video_url: str
-    target_language: str
-
-class VideoTranslationResponse(BaseModel):
-    translated_video_url: str
-
-# Story models for internal use
-class MediaElement(BaseModel):
-    image_prompt: str
-    audio_narration: str
-    background_music: str = "ambient"
-    duration_seconds: float = 5.0
-
-class Scene(BaseModel):
-    title: str
-    description: str
-    media: MediaElement
-    transition: str = "cut"
-
-class StoryResponse(BaseModel):
-    title: str
-    theme: str
-    scenes: List[Scene]
-    metadata: Dict[str, Any] = {}
\ No newline at end of file
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, List, Literal
+
+# Authentication models
+class Token(BaseModel):
+    access_token: str
+    token_type: str
+
+class TokenData(BaseModel):
+    username: Optional[str] = None
+
+class User(BaseModel):
+    username: str
+    disabled: Optional[bool] = None
+
+# Image generation models
+class ImageGenerationRequest(BaseModel):
+    prompt: str
+
+class ImageGenerationResponse(BaseModel):
+    image_url: str
+
+# Video generation models
+class VideoGenerationRequest(BaseModel):
+    prompt: Optional[str] = None
+    target_language: str = "en"
+    story: Optional[str] = None
+    story_id: Optional[str] = None
+    structured_story: Optional["StoryResponse"] = None
+    render_engine: Optional[Literal["ffmpeg", "ffmpeg_segments", "moviepy"]] = None
+    stream_story: bool = False
+    resolution: Optional[Literal["720p", "1080p", "vertical"]] = None
+
+class VideoGenerationResponse(BaseModel):
+    video_url: str
+
+# Job models
+class JobSubmissionResponse(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+
+class JobStatusResponse(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    stage: Optional[str] = None
+    progress: float = 0.0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    metrics: Optional[Dict[str, Dict[str, float]]] = None
+
+# Project models
+class ProjectScene(BaseModel):
+    image_prompt: str
+    narration: str
+
+class ProjectRenderRequest(BaseModel):
+    scenes: List[ProjectScene] = Field(..., min_items=1)
+    target_language: str = "en"
+    title: Optional[str] = None
+    resolution: Optional[Literal["720p", "1080p", "vertical"]] = None
+
+class ProjectResponse(BaseModel):
+    project_id: str
+    title: Optional[str] = None
+    revision: int
+    target_language: str
+    resolution: Optional[str] = None
+    scenes: List[Dict[str, Any]]
+    video_url: Optional[str] = None
+    updated_at: Optional[str] = None
+
+# Video translation models
+class VideoTranslationRequest(BaseModel):
+    video_url: str
+    target_language: str
+
+class LanguageTranslationResult(BaseModel):
+    status: str
+    translated_video_url: Optional[str] = None
+    translated_audio: Optional[str] = None
+    error: Optional[str] = None
+
+class VideoTranslationResponse(BaseModel):
+    translated_video_url: Optional[str] = None
+    original_audio: Optional[str] = None
+    translated_audio: Optional[str] = None
+    translations: Dict[str, LanguageTranslationResult] = {}
+    metrics: Optional[Dict[str, Dict[str, float]]] = None
+
+# Story models
+class MediaElement(BaseModel):
+    image_prompt: str
+    audio_narration: str
+    background_music: str = "ambient"
+    duration_seconds: float = 5.0
+
+class Scene(BaseModel):
+    title: str
+    description: str
+    media: MediaElement
+    transition: str = "cut"
+
+class StoryResponse(BaseModel):
+    title: str
+    theme: str
+    scenes: List[Scene]
+    metadata: Dict[str, Any] = {}
+
+class StoryGenerationRequest(BaseModel):
+    prompt: str
+    num_scenes: int = 3
+    style: Optional[str] = None
+
+VideoGenerationRequest.update_forward_refs()
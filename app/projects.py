@@ -0,0 +1,244 @@
+import os
+import re
+import json
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from app.cache import normalize_text, stable_hash
+from app.artifacts import artifact_store
+from app.metrics import bind_context
+from app.video_gen import (
+    ImageModel,
+    AudioModel,
+    generate_scene_assets,
+    encode_scene_segment,
+    concat_segments,
+    SEGMENT_VIDEO_ARGS,
+    SEGMENT_AUDIO_ARGS,
+    SEGMENT_ENCODE_WORKERS,
+    VIDEO_RESOLUTION,
+    VIDEO_FPS,
+    resolution_preset,
+)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Project storage
+PROJECTS_DIR = os.getenv("PROJECTS_DIR", "projects")
+
+# Project IDs are UUID hex strings; anything else could escape PROJECTS_DIR
+PROJECT_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+# Narration voice used by AudioModel
+NARRATION_VOICE = "shimmer"
+
+# Per-project locks so concurrent re-renders of one project do not interleave
+_project_locks: Dict[str, threading.Lock] = {}
+_project_locks_guard = threading.Lock()
+
+
+def _project_lock(project_id: str) -> threading.Lock:
+    with _project_locks_guard:
+        return _project_locks.setdefault(project_id, threading.Lock())
+
+
+def _project_dir(project_id: str) -> str:
+    if not PROJECT_ID_PATTERN.fullmatch(project_id):
+        raise ValueError(f"Invalid project ID: {project_id}")
+    return os.path.join(PROJECTS_DIR, project_id)
+
+
+def scene_fingerprint(scene: Dict[str, Any], language: str, resolution: str = VIDEO_RESOLUTION) -> str:
+    """
+    Fingerprint every input that affects a scene's encoded segment
+
+    Args:
+        scene: Scene dictionary with "image_prompt" and "narration" keys
+        language: Narration language code
+        resolution: Resolution preset name
+
+    Returns:
+        Stable digest of the scene inputs and render parameters
+    """
+    return stable_hash(
+        "scene", scene["image_prompt"], normalize_text(scene["narration"]), NARRATION_VOICE, language,
+        resolution_preset(resolution), VIDEO_FPS, SEGMENT_VIDEO_ARGS, SEGMENT_AUDIO_ARGS
+    )
+
+
+def load_project(project_id: str) -> Optional[Dict[str, Any]]:
+    """Load a project manifest, or return None if the project does not exist"""
+    try:
+        manifest_path = os.path.join(_project_dir(project_id), "manifest.json")
+    except ValueError:
+        return None
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as manifest_file:
+        return json.load(manifest_file)
+
+
+def save_project(manifest: Dict[str, Any]):
+    """Write a project manifest atomically"""
+    project_dir = _project_dir(manifest["project_id"])
+    os.makedirs(project_dir, exist_ok=True)
+    manifest["updated_at"] = datetime.now().isoformat()
+    manifest_path = os.path.join(project_dir, "manifest.json")
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path)
+
+
+def create_project(scenes: List[Dict[str, Any]], target_language: str = "en", title: Optional[str] = None,
+                   project_id: Optional[str] = None, resolution: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Create a project manifest for a story without rendering it
+
+    Args:
+        scenes: Scene dictionaries with "image_prompt" and "narration" keys
+        target_language: Narration language code
+        title: Optional story title
+        project_id: Optional project ID (default: a new UUID)
+        resolution: Resolution preset name (default: VIDEO_RESOLUTION)
+
+    Returns:
+        The project manifest
+    """
+    manifest = {
+        "project_id": project_id or uuid.uuid4().hex,
+        "title": title,
+        "revision": 0,
+        "target_language": target_language,
+        "resolution": resolution or VIDEO_RESOLUTION,
+        "scenes": [
+            {"image_prompt": scene["image_prompt"], "narration": scene["narration"],
+             "fingerprint": None, "segment": None}
+            for scene in scenes
+        ],
+        "video_url": None,
+    }
+    save_project(manifest)
+    return manifest
+
+
+def render_project(project_id: str, scenes: List[Dict[str, Any]], target_language: str = "en",
+                   title: Optional[str] = None, resolution: Optional[str] = None, progress=None) -> Dict[str, Any]:
+    """
+    Render a project, re-encoding only the scenes whose inputs changed
+
+    Every scene is fingerprinted (see scene_fingerprint) and its encoded segment is
+    kept in the project directory under that fingerprint. Scenes whose fingerprint
+    matches a kept segment are reused as-is; assets are regenerated and segments
+    re-encoded only for the others, and all segments are then joined with a
+    stream copy.
+
+    Args:
+        project_id: Project ID; a new project is created if it does not exist
+        scenes: Scene dictionaries with "image_prompt" and "narration" keys, in order
+        target_language: Narration language code
+        title: Optional story title
+        resolution: Resolution preset name (default: the project's resolution)
+        progress: Optional callback ``progress(stage, fraction)`` for status reporting
+
+    Returns:
+        Dictionary with the video URL, the project revision and the reused/rendered scene numbers
+    """
+    if progress is None:
+        progress = lambda stage, fraction: None
+    if not scenes:
+        raise ValueError("A project needs at least one scene")
+    _project_dir(project_id)  # Rejects invalid IDs before any lock or directory is created
+
+    with _project_lock(project_id):
+        manifest = load_project(project_id) or create_project([], target_language, title, project_id, resolution)
+        resolution = resolution or manifest.get("resolution") or VIDEO_RESOLUTION
+        video_size = resolution_preset(resolution)["video_size"]
+        project_dir = _project_dir(project_id)
+        segments_dir = os.path.join(project_dir, "segments")
+        os.makedirs(segments_dir, exist_ok=True)
+
+        # Match scenes against the segments kept from earlier renders
+        fingerprints = [scene_fingerprint(scene, target_language, resolution) for scene in scenes]
+        segment_paths = [os.path.join(segments_dir, f"{fingerprint}.mp4") for fingerprint in fingerprints]
+        reused, changed, pending = [], [], set()
+        for scene_num, segment_path in enumerate(segment_paths, 1):
+            if os.path.exists(segment_path) or segment_path in pending:
+                reused.append(scene_num)
+            else:
+                changed.append(scene_num)
+                pending.add(segment_path)
+        logger.info(f"Rendering project {project_id}: reusing scenes {reused}, rendering scenes {changed}")
+
+        if changed:
+            # Regenerate assets for the changed scenes only
+            progress("scene_assets", 0.1)
+            generate_scene_assets(
+                [scenes[n - 1] for n in changed], project_dir, ImageModel(resolution=resolution), AudioModel(),
+                scene_numbers=changed
+            )
+
+            progress("encode", 0.5)
+            with ThreadPoolExecutor(max_workers=max(1, SEGMENT_ENCODE_WORKERS),
+                                    thread_name_prefix="segment-encode") as executor:
+                futures = [
+                    executor.submit(bind_context(encode_scene_segment), f"{project_dir}/scene_{n}.jpg",
+                                    f"{project_dir}/scene_{n}.mp3", segment_paths[n - 1], video_size, VIDEO_FPS)
+                    for n in changed
+                ]
+                for future in futures:
+                    future.result()
+
+            for n in changed:
+                for path in (f"{project_dir}/scene_{n}.jpg", f"{project_dir}/scene_{n}.mp3"):
+                    if os.path.exists(path):
+                        os.remove(path)
+
+        # Join all segments into the new revision
+        progress("concat", 0.9)
+        revision = manifest["revision"] + 1
+        # Join straight into the artifact store; the video is written only once
+        output_path = artifact_store.path("temp_videos", f"project_{project_id}", f"video_r{revision}.mp4")
+        concat_segments(segment_paths, output_path)
+        artifact_store.register(output_path, owner=f"project_{project_id}")
+        video_url = artifact_store.url(output_path)
+
+        # Drop segments no longer referenced by any scene
+        for filename in os.listdir(segments_dir):
+            if os.path.join(segments_dir, filename) not in segment_paths:
+                os.remove(os.path.join(segments_dir, filename))
+
+        manifest.update({
+            "title": title or manifest.get("title"),
+            "revision": revision,
+            "target_language": target_language,
+            "resolution": resolution,
+            "scenes": [
+                {"image_prompt": scene["image_prompt"], "narration": scene["narration"],
+                 "fingerprint": fingerprint, "segment": segment_path}
+                for scene, fingerprint, segment_path in zip(scenes, fingerprints, segment_paths)
+            ],
+            "video_url": video_url,
+        })
+        save_project(manifest)
+
+    logger.info(f"Project {project_id} rendered as revision {revision}")
+    return {
+        "project_id": project_id,
+        "revision": revision,
+        "video_url": video_url,
+        "resolution": resolution,
+        "reused_scenes": reused,
+        "rendered_scenes": changed,
+    }
@@ -0,0 +1,49 @@
+import logging
+
+from PIL import Image, ImageOps
+from moviepy import ImageClip, AudioFileClip, concatenate_videoclips
+
+# CPU-bound work run in the process pool. Spawned workers import this module by
+# name, so it must not import application modules or create anything at import time.
+
+logger = logging.getLogger(__name__)
+
+
+def fit_image(source_path: str, output_path: str, video_size: tuple):
+    """Scale an image to the video size, cropping rather than stretching, and save it as JPEG"""
+    with Image.open(source_path) as image:
+        ImageOps.fit(image.convert("RGB"), video_size, Image.LANCZOS).save(output_path, format="JPEG", quality=92)
+
+
+def render_video_moviepy(dir_name: str, scenes: list, output_path: str, video_size: tuple, fps: int):
+    """Render the scenes frame by frame with MoviePy"""
+    clips = []
+    for scene_num in scenes:
+        logger.info(f"Processing scene {scene_num}")
+
+        img_clip = ImageClip(f"{dir_name}/scene_{scene_num}.jpg")
+        audio_clip = AudioFileClip(f"{dir_name}/scene_{scene_num}.mp3")
+        
+        # Set the duration of the image clip to match the audio duration
+        img_clip = img_clip.with_duration(audio_clip.duration).with_audio(audio_clip)
+        if tuple(img_clip.size) != tuple(video_size):
+            # Scene images are normally render-ready already; scale any other image once here
+            img_clip = img_clip.resized(video_size)
+
+        clips.append(img_clip)
+
+    logger.info("Concatenating video clips")
+    final_video = concatenate_videoclips(clips)
+    
+    # Write the final video file
+    final_video.write_videofile(
+        output_path,
+        fps=fps,
+        codec="libx264",
+        audio_codec="aac"
+    )
+
+    # Close clips to release resources
+    final_video.close()
+    for clip in clips:
+        clip.close()
@@ -0,0 +1,68 @@
+import os
+import re
+import json
+import uuid
+import logging
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+from app.cache import stable_hash
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Story storage
+STORIES_DIR = os.getenv("STORIES_DIR", "stories")
+
+STORY_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+def story_cache_key(model: str, prompt: str, num_scenes: int, style: Optional[str]) -> str:
+    """Return the story ID under which a generated story for these inputs is cached"""
+    return stable_hash("story", model, prompt, num_scenes, style)[:32]
+
+
+def _story_path(story_id: str) -> str:
+    if not STORY_ID_PATTERN.fullmatch(story_id):
+        raise ValueError(f"Invalid story ID: {story_id}")
+    return os.path.join(STORIES_DIR, f"{story_id}.json")
+
+
+def save_story(story: Dict[str, Any], story_id: Optional[str] = None) -> str:
+    """
+    Persist a structured story
+
+    Args:
+        story: Story dictionary in the StoryResponse shape
+        story_id: Optional story ID (default: a new UUID)
+
+    Returns:
+        The story ID, also recorded in the story's metadata
+    """
+    story_id = story_id or uuid.uuid4().hex
+    path = _story_path(story_id)
+    os.makedirs(STORIES_DIR, exist_ok=True)
+    story.setdefault("metadata", {})["story_id"] = story_id
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as story_file:
+        json.dump(story, story_file, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    logger.info(f"Saved story {story_id}")
+    return story_id
+
+
+def load_story(story_id: str) -> Optional[Dict[str, Any]]:
+    """Load a stored story, or return None if it does not exist"""
+    try:
+        path = _story_path(story_id)
+    except ValueError:
+        return None
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as story_file:
+        return json.load(story_file)
@@ -0,0 +1,267 @@
+import os
+import queue
+import shutil
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from app.clients import clients
+from app.media import probe_duration, detect_silences, extract_audio_chunk
+from app.metrics import stage, bind_context
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Transcription configuration
+TRANSCRIPTION_BACKEND = os.getenv("TRANSCRIPTION_BACKEND", "openai")
+TRANSCRIPTION_CHUNK_SECONDS = float(os.getenv("TRANSCRIPTION_CHUNK_SECONDS", "600"))
+TRANSCRIPTION_CONCURRENCY = int(os.getenv("TRANSCRIPTION_CONCURRENCY", "4"))
+LOCAL_WHISPER_MODEL = os.getenv("LOCAL_WHISPER_MODEL", "base")
+LOCAL_WHISPER_POOL_SIZE = int(os.getenv("LOCAL_WHISPER_POOL_SIZE", "1"))
+LOCAL_WHISPER_THREADS = int(os.getenv("LOCAL_WHISPER_THREADS", "0"))
+LOCAL_WHISPER_BATCH_SIZE = int(os.getenv("LOCAL_WHISPER_BATCH_SIZE", "1"))
+
+# The whisper-1 API rejects uploads above 25 MB
+OPENAI_MAX_UPLOAD_BYTES = 24 * 1024 * 1024
+
+# It also rejects audio shorter than 0.1 s, so no chunk is cut shorter than this
+MIN_CHUNK_SECONDS = 1.0
+
+# Audio codecs the transcription backends accept as they are, with the container to upload them in
+TRANSCRIBABLE_CODECS = {
+    "aac": ".m4a",
+    "mp3": ".mp3",
+    "opus": ".webm",
+    "vorbis": ".ogg",
+    "flac": ".flac",
+}
+
+
+def _field(item: Any, name: str):
+    # SDK responses may be objects or plain dictionaries
+    return item[name] if isinstance(item, dict) else getattr(item, name)
+
+
+class OpenAITranscriptionBackend:
+    """Transcribes audio with the remote whisper-1 API"""
+
+    name = "openai"
+    max_concurrency = TRANSCRIPTION_CONCURRENCY
+
+    def __init__(self, api_key: Optional[str] = None, client=None):
+        self.client = client if client is not None else clients.openai(api_key)
+
+    def transcribe(self, audio_path: str) -> List[Dict[str, Any]]:
+        """Return the timestamped segments of an audio file"""
+        with open(audio_path, "rb") as audio_file:
+            response = self.client.audio.transcriptions.create(
+                model="whisper-1",
+                file=audio_file,
+                response_format="verbose_json"
+            )
+        segments = getattr(response, "segments", None) or []
+        if not segments:
+            # No segment timing returned; treat the text as one segment
+            return [{"start": 0.0, "end": float(getattr(response, "duration", 0.0) or 0.0), "text": response.text}]
+        return [
+            {"start": float(_field(s, "start")), "end": float(_field(s, "end")), "text": _field(s, "text")}
+            for s in segments
+        ]
+
+
+class LocalWhisperBackend:
+    """
+    Transcribes audio on the CPU with local Whisper models, without network access
+
+    ``pool_size`` model instances are loaded and warmed up once, then shared by
+    every request in the process; each instance decodes one chunk at a time. With
+    ``batch_size`` above 1, a chunk is cut into 30 second windows that are decoded
+    through the model in batches, trading segment timing granularity (one segment
+    per window) for throughput.
+    """
+
+    name = "local"
+
+    def __init__(self, model_name: str = LOCAL_WHISPER_MODEL, pool_size: int = LOCAL_WHISPER_POOL_SIZE,
+                 threads: int = LOCAL_WHISPER_THREADS, batch_size: int = LOCAL_WHISPER_BATCH_SIZE):
+        import numpy
+        import torch
+        import whisper
+
+        self._whisper = whisper
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_concurrency = max(1, pool_size)
+        if threads > 0:
+            torch.set_num_threads(threads)
+
+        self._models = queue.Queue()
+        for i in range(self.max_concurrency):
+            logger.info(f"Loading local Whisper model '{model_name}' ({i + 1}/{self.max_concurrency})")
+            model = whisper.load_model(model_name, device="cpu")
+            # Run one second of silence through the model so the first request is not slow
+            model.transcribe(numpy.zeros(whisper.audio.SAMPLE_RATE, dtype=numpy.float32), fp16=False)
+            self._models.put(model)
+        logger.info(f"Local Whisper pool ready with {self.max_concurrency} models and {torch.get_num_threads()} torch threads")
+
+    def transcribe(self, audio_path: str) -> List[Dict[str, Any]]:
+        """Return the timestamped segments of an audio file"""
+        model = self._models.get()
+        try:
+            if self.batch_size > 1:
+                return self._transcribe_batched(model, audio_path)
+            result = model.transcribe(audio_path, fp16=False)
+        finally:
+            self._models.put(model)
+        return [
+            {"start": float(s["start"]), "end": float(s["end"]), "text": s["text"]}
+            for s in result["segments"]
+        ]
+
+    def _transcribe_batched(self, model, audio_path: str) -> List[Dict[str, Any]]:
+        whisper = self._whisper
+        import torch
+
+        audio = whisper.load_audio(audio_path)
+        window = whisper.audio.N_SAMPLES
+        starts = list(range(0, len(audio), window))
+        options = whisper.DecodingOptions(fp16=False, without_timestamps=True)
+        segments = []
+        for batch_start in range(0, len(starts), self.batch_size):
+            batch = starts[batch_start:batch_start + self.batch_size]
+            mels = torch.stack([
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(audio[start:start + window]), model.dims.n_mels)
+                for start in batch
+            ])
+            with torch.no_grad():
+                results = model.decode(mels, options)
+            for start, result in zip(batch, results):
+                end = min(start + window, len(audio))
+                segments.append({
+                    "start": start / whisper.audio.SAMPLE_RATE,
+                    "end": end / whisper.audio.SAMPLE_RATE,
+                    "text": result.text
+                })
+        return segments
+
+
+def preload_transcription_backend():
+    """Load the configured backend at startup so the local Whisper pool is warm before the first request"""
+    if TRANSCRIPTION_BACKEND == "local":
+        get_transcription_backend("local")
+
+
+_local_backend: Optional[LocalWhisperBackend] = None
+_local_backend_lock = threading.Lock()
+
+
+def get_transcription_backend(name: Optional[str] = None, api_key: Optional[str] = None):
+    """
+    Return a transcription backend
+
+    Args:
+        name: "openai" or "local" (default: TRANSCRIPTION_BACKEND)
+        api_key: Optional OpenAI API key for the remote backend
+
+    Returns:
+        Backend with a ``transcribe(audio_path)`` method returning timestamped segments
+    """
+    name = name or TRANSCRIPTION_BACKEND
+    if name == "openai":
+        return OpenAITranscriptionBackend(api_key)
+    if name == "local":
+        global _local_backend
+        with _local_backend_lock:
+            # Load the model once and reuse it
+            if _local_backend is None:
+                _local_backend = LocalWhisperBackend()
+            return _local_backend
+    raise ValueError(f"Unknown transcription backend: {name}")
+
+
+def plan_chunks(duration: float, silences: List[Tuple[float, float]], max_chunk_seconds: float,
+                min_chunk_seconds: float = MIN_CHUNK_SECONDS) -> List[Tuple[float, float]]:
+    """
+    Split a recording into chunks no longer than max_chunk_seconds, cutting in silences
+
+    Each cut is placed in the middle of the last silence before the length limit;
+    if a stretch has no silence, it is cut hard at the limit. No cut leaves a
+    chunk shorter than min_chunk_seconds, including the final remainder, which
+    instead moves the last cut earlier.
+
+    Returns:
+        List of (start, end) times of the chunks in seconds
+    """
+    min_chunk_seconds = min(min_chunk_seconds, max_chunk_seconds / 2)
+    midpoints = sorted((start + end) / 2 for start, end in silences)
+    cuts = [0.0]
+    while duration - cuts[-1] > max_chunk_seconds:
+        limit = min(cuts[-1] + max_chunk_seconds, duration - min_chunk_seconds)
+        options = [m for m in midpoints if cuts[-1] + min_chunk_seconds <= m <= limit]
+        cuts.append(options[-1] if options else limit)
+    cuts.append(duration)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def transcribe_in_chunks(audio_path: str, backend=None, max_chunk_seconds: float = TRANSCRIPTION_CHUNK_SECONDS,
+                         max_concurrency: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Transcribe audio as silence-aligned chunks in parallel and stitch the results
+
+    Args:
+        audio_path: Audio file to transcribe
+        backend: Transcription backend (default: get_transcription_backend())
+        max_chunk_seconds: Maximum length of a chunk
+        max_concurrency: Chunks transcribed at once (default: the backend's limit)
+
+    Returns:
+        Dictionary with the full "text" and its "segments", each with start/end
+        times in seconds relative to the whole recording
+    """
+    backend = backend or get_transcription_backend()
+    max_concurrency = max_concurrency or backend.max_concurrency
+    duration = probe_duration(audio_path)
+
+    # Short recordings within the upload limit are sent as they are
+    if duration <= max_chunk_seconds and os.path.getsize(audio_path) <= OPENAI_MAX_UPLOAD_BYTES:
+        chunks = [(0.0, duration)]
+        chunk_paths = [audio_path]
+        chunk_dir = None
+    else:
+        chunks = plan_chunks(duration, detect_silences(audio_path), max_chunk_seconds)
+        chunk_dir = tempfile.mkdtemp(prefix="transcription_")
+        chunk_paths = [os.path.join(chunk_dir, f"chunk_{i}.mp3") for i in range(len(chunks))]
+
+    def transcribe_chunk(index: int) -> List[Dict[str, Any]]:
+        if chunk_dir:
+            start, end = chunks[index]
+            with stage("extract_audio_chunk"):
+                extract_audio_chunk(audio_path, start, end - start, chunk_paths[index])
+        with stage(f"transcribe_chunk_{backend.name}") as span:
+            span.add_bytes(os.path.getsize(chunk_paths[index]))
+            return backend.transcribe(chunk_paths[index])
+
+    try:
+        logger.info(f"Transcribing {duration:.1f}s of audio as {len(chunks)} chunks with concurrency {max_concurrency}")
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="transcribe") as executor:
+            results = list(executor.map(bind_context(transcribe_chunk), range(len(chunks))))
+    finally:
+        if chunk_dir:
+            shutil.rmtree(chunk_dir, ignore_errors=True)
+
+    # Shift chunk-relative timestamps onto the recording's timeline
+    segments = []
+    for (start, _), chunk_segments in zip(chunks, results):
+        for segment in chunk_segments:
+            text = segment["text"].strip()
+            if text:
+                segments.append({"start": start + segment["start"], "end": start + segment["end"], "text": text})
+    return {"text": " ".join(segment["text"] for segment in segments), "segments": segments}
@@ -0,0 +1,257 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from app.cache import CACHE_DIR, stable_hash, normalize_text
+from app.metrics import stage, bind_context
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+# Translation configuration
+TRANSLATION_BACKEND = os.getenv("TRANSLATION_BACKEND", "google")
+TRANSLATION_BATCH_CHARS = int(os.getenv("TRANSLATION_BATCH_CHARS", "4500"))
+TRANSLATION_CONCURRENCY = int(os.getenv("TRANSLATION_CONCURRENCY", "4"))
+TRANSLATION_MEMORY_MAX_ENTRIES = int(os.getenv("TRANSLATION_MEMORY_MAX_ENTRIES", "200000"))
+
+# Segments of a batch are sent as one text, one segment per line
+BATCH_SEPARATOR = "\n"
+
+
+class GoogleTranslationBackend:
+    """Translates with Google Translate through deep_translator"""
+
+    name = "google"
+
+    def __init__(self):
+        # deep_translator keeps the text of the request on the translator, so an
+        # instance must never be shared between threads; each thread keeps its own
+        self._local = threading.local()
+
+    def _translator(self, source: str, target: str):
+        from deep_translator import GoogleTranslator
+
+        translators = getattr(self._local, "translators", None)
+        if translators is None:
+            translators = self._local.translators = {}
+        translator = translators.get((source, target))
+        if translator is None:
+            translator = translators[(source, target)] = GoogleTranslator(source=source, target=target)
+        return translator
+
+    def translate_batch(self, texts: List[str], source: str, target: str) -> List[str]:
+        """Translate several single-line texts in one request"""
+        translator = self._translator(source, target)
+        translated = translator.translate(BATCH_SEPARATOR.join(texts)) or ""
+        lines = translated.split(BATCH_SEPARATOR)
+        if len(lines) == len(texts):
+            return [line.strip() for line in lines]
+        # The service merged or split lines; translate the texts one by one instead
+        logger.warning(f"Batch of {len(texts)} came back as {len(lines)} lines; translating individually")
+        return [(translator.translate(text) or "").strip() for text in texts]
+
+
+class EchoTranslationBackend:
+    """
+    Offline stand-in that returns each text tagged with the target language
+
+    Makes no network calls, so the pipeline can run in tests and benchmarks.
+    """
+
+    name = "echo"
+
+    def translate_batch(self, texts: List[str], source: str, target: str) -> List[str]:
+        return [f"[{target}] {text}" for text in texts]
+
+
+TRANSLATION_BACKENDS = {
+    "google": GoogleTranslationBackend,
+    "echo": EchoTranslationBackend,
+}
+
+
+def get_translation_backend(name: Optional[str] = None):
+    """
+    Return a translation backend
+
+    Args:
+        name: "google" or "echo" (default: TRANSLATION_BACKEND)
+
+    Returns:
+        Backend with a ``translate_batch(texts, source, target)`` method
+    """
+    name = name or TRANSLATION_BACKEND
+    if name not in TRANSLATION_BACKENDS:
+        raise ValueError(f"Unknown translation backend: {name}")
+    return TRANSLATION_BACKENDS[name]()
+
+
+class TranslationMemory:
+    """
+    Persistent store of earlier translations with LRU eviction
+
+    Entries are keyed on the hash of the normalized source text, the source
+    language and the target language, and kept in a SQLite database so they are
+    reused across videos and restarts. Once ``max_entries`` is exceeded, the
+    least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "key TEXT PRIMARY KEY, source_language TEXT, target_language TEXT, "
+            "translation TEXT, last_used REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+        self._db.commit()
+
+    @staticmethod
+    def key(text: str, source: str, target: str) -> str:
+        """Return the memory key of a text and language pair"""
+        return stable_hash("translation", source, target, normalize_text(text))
+
+    def get_many(self, keys: List[str]) -> Dict[str, str]:
+        """Return the stored translations for the keys that are present"""
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT key, translation FROM translations WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                found.update(rows)
+            if found:
+                # Record the access for LRU eviction
+                now = time.time()
+                self._db.executemany("UPDATE translations SET last_used = ? WHERE key = ?",
+                                     [(now, key) for key in found])
+                self._db.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, entries: Dict[str, str], source: str, target: str):
+        """Store translations by key and evict the least recently used entries over the limit"""
+        if not entries:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?)",
+                [(key, source, target, translation, now) for key, translation in entries.items()]
+            )
+            count = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            excess = count - self.max_entries
+            if excess > 0:
+                self._db.execute(
+                    "DELETE FROM translations WHERE key IN "
+                    "(SELECT key FROM translations ORDER BY last_used LIMIT ?)", (excess,)
+                )
+                self.evictions += excess
+            self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and size of the memory"""
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def plan_batches(texts: List[str], max_chars: int) -> List[List[int]]:
+    """Group text indexes into batches whose joined length stays within max_chars"""
+    batches, current, size = [], [], 0
+    for index, text in enumerate(texts):
+        length = len(text) + len(BATCH_SEPARATOR)
+        if current and size + length > max_chars:
+            batches.append(current)
+            current, size = [], 0
+        current.append(index)
+        size += length
+    if current:
+        batches.append(current)
+    return batches
+
+
+def translate_texts(texts: List[str], target_language: str, source_language: str = "auto", backend=None,
+                    memory: Optional[TranslationMemory] = None, max_concurrency: int = TRANSLATION_CONCURRENCY,
+                    max_batch_chars: int = TRANSLATION_BATCH_CHARS) -> List[str]:
+    """
+    Translate a list of texts, reusing the translation memory
+
+    Texts already in the memory are not sent again. The remaining distinct
+    texts are grouped into size-limited batches that are translated concurrently
+    and stored in the memory.
+
+    Args:
+        texts: Texts to translate
+        target_language: Target language code
+        source_language: Source language code (default: detected)
+        backend: Translation backend (default: get_translation_backend())
+        memory: Translation memory (default: the shared translation_memory)
+        max_concurrency: Batches translated at once
+        max_batch_chars: Maximum characters per batch request
+
+    Returns:
+        Translations in the same order as the texts
+    """
+    memory = memory or translation_memory
+    # Line breaks separate segments within a batch, so they cannot appear inside one
+    cleaned = [normalize_text(text) for text in texts]
+    keys = [TranslationMemory.key(text, source_language, target_language) for text in cleaned]
+    found = memory.get_many(list(set(keys)))
+
+    pending = {}
+    for key, text in zip(keys, cleaned):
+        if key not in found and text:
+            pending.setdefault(key, text)
+
+    if pending:
+        backend = backend or get_translation_backend()
+        pending_keys = list(pending)
+        pending_texts = [pending[key] for key in pending_keys]
+        batches = plan_batches(pending_texts, max_batch_chars)
+        logger.info(f"Translating {len(pending_texts)} texts to {target_language} in {len(batches)} batches "
+                    f"({len(found)} from translation memory)")
+
+        def translate_batch(indexes: List[int]) -> Dict[str, str]:
+            texts = [pending_texts[i] for i in indexes]
+            with stage("translate_batch") as span:
+                span.add_bytes(sum(len(text.encode("utf-8")) for text in texts))
+                results = backend.translate_batch(texts, source_language, target_language)
+            return {pending_keys[i]: result for i, result in zip(indexes, results)}
+
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="translate") as executor:
+            for translated in executor.map(bind_context(translate_batch), batches):
+                memory.put_many(translated, source_language, target_language)
+                found.update(translated)
+
+    return [found.get(key, "") for key in keys]
+
+
+# Shared translation memory, reused across videos
+translation_memory = TranslationMemory(os.path.join(CACHE_DIR, "translation_memory.sqlite3"),
+                                       TRANSLATION_MEMORY_MAX_ENTRIES)
@@ -1,472 +1,1075 @@
-import os
-import json
-import logging
-from typing import List, Dict, Any, Optional
-from pydantic import BaseModel, Field
-from datetime import datetime
-from dotenv import load_dotenv
-from openai import OpenAI
-from PIL import Image
-from io import BytesIO
-import requests
-import moviepy
-from moviepy import ImageClip, AudioFileClip, concatenate_videoclips
-
-# Image generation class
-class ImageModel:
-    def __init__(self):
-        logging.info("Initializing OpenAI client for image generation")
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable not set")
-        self.client = OpenAI(api_key=api_key)
-        logging.info("Initialized OpenAI client for image generation")
-
-    def generate_image_for_video(self, prompt: str, dir_name: str, img_name: str) -> str:
-        """Generate an image using OpenAI's DALL-E model"""
-        logging.info(f"Generating image with prompt: {prompt[:50]}...")
-        try:
-            response = self.client.images.generate(
-                model="dall-e-3",
-                prompt=prompt,
-                size="1024x1024",
-                quality="standard",
-                n=1,
-            )
-            logging.info("Generated image for video")
-            
-            image_url = response.data[0].url
-            image_response = requests.get(image_url)
-            image = Image.open(BytesIO(image_response.content))
-            
-            # Ensure directory exists in both backend and frontend locations
-            os.makedirs(dir_name, exist_ok=True)
-            
-            # Save the image in the backend directory
-            image_path = f"{dir_name}/{img_name}.jpg"
-            image.save(image_path)
-            logging.info(f"Saved image to {image_path}")
-            
-            # Also save to frontend public directory for proper serving by Vite
-            frontend_dir = os.path.join("..", "UI", "public", dir_name)
-            os.makedirs(frontend_dir, exist_ok=True)
-            frontend_path = f"{frontend_dir}/{img_name}.jpg"
-            image.save(frontend_path)
-            logging.info(f"Saved image to frontend at {frontend_path}")
-            
-            return image_path
-        except Exception as e:
-            logging.error(f"Error generating image: {str(e)}")
-            raise
-
-# Audio generation class
-class AudioModel:
-    def __init__(self):
-        logging.info("Initializing OpenAI client for audio generation")
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable not set")
-        self.client = OpenAI(api_key=api_key)
-        logging.info("Initialized OpenAI client for audio generation")
-
-    def generate_audio_for_video(self, prompt: str, dir_name: str, audio_name: str) -> str:
-        """Generate audio using OpenAI's TTS model"""
-        logging.info("Generating audio for video")
-        try:
-            # Ensure directory exists
-            os.makedirs(dir_name, exist_ok=True)
-            
-            response = self.client.audio.speech.create(
-                model="tts-1-hd",
-                voice="shimmer",
-                input=prompt,
-                speed=0.90
-            )
-            logging.info("Generated audio for video")
-            
-            audio_path = f"{dir_name}/{audio_name}"
-            with open(audio_path, "wb") as audio_file:
-                for chunk in response.iter_bytes():
-                    audio_file.write(chunk)
-            logging.info(f"Saved audio to {audio_path}")
-            
-            return audio_path
-        except Exception as e:
-            logging.error(f"Error generating audio: {str(e)}")
-            raise
-
-# Video synchronization function
-def generate_video(video_store: str, dir_name: str, scenes: list, output_name: str = "video.mp4") -> str:
-    """
-    Generate a video by combining images and audio for each scene
-    
-    Args:
-        video_store: Directory to store the final video (in UI/public/temp_videos)
-        dir_name: Directory containing the scene images and audio
-        scenes: List of scene numbers to include in the video
-        output_name: Name of the output video file (default: video.mp4)
-        
-    Returns:
-        Path to the generated video
-    """
-    try:
-        logging.info(f"Generating video with {len(scenes)} scenes")
-        
-        video_size = (1920, 1080)
-        fps = 30
-        
-        # Ensure directory exists
-        os.makedirs(dir_name, exist_ok=True)
-        
-        # Ensure video store directory exists
-        os.makedirs(video_store, exist_ok=True)
-
-        # Output paths
-        output_path = f"{dir_name}/{output_name}"
-        frontend_path = f"{video_store}/{output_name}"
-
-        clips = []
-        for scene_num in scenes:
-            logging.info(f"Processing scene {scene_num}")
-
-            img_clip = ImageClip(f"{dir_name}/scene_{scene_num}.jpg")
-            audio_clip = AudioFileClip(f"{dir_name}/scene_{scene_num}.mp3")
-            
-            # Set the duration of the image clip to match the audio duration
-            img_clip = img_clip.with_duration(audio_clip.duration).resized(video_size).with_audio(audio_clip)
-
-            clips.append(img_clip)
-
-        logging.info("Concatenating video clips")
-        final_video = concatenate_videoclips(clips)
-        
-        # Write the final video file
-        final_video.write_videofile(
-            output_path,
-            fps=fps,
-            codec="libx264",
-            audio_codec="aac"
-        )
-        
-        # Copy the video to the frontend assets directory
-        import shutil
-        shutil.copy(output_path, frontend_path)
-        logging.info(f"Video copied to frontend at {frontend_path}")
-
-        # Close clips to release resources
-        final_video.close()
-        for clip in clips:
-            clip.close()
-        
-        # Clean up temporary files (images and audio)
-        try:
-            for scene_num in scenes:
-                # Remove image and audio files
-                image_path = f"{dir_name}/scene_{scene_num}.jpg"
-                audio_path = f"{dir_name}/scene_{scene_num}.mp3"
-                
-                if os.path.exists(image_path):
-                    os.remove(image_path)
-                    logging.info(f"Removed temporary image: {image_path}")
-                    
-                if os.path.exists(audio_path):
-                    os.remove(audio_path)
-                    logging.info(f"Removed temporary audio: {audio_path}")
-            
-            # Keep the final video file in the temporary directory
-            logging.info(f"Cleaned up temporary files in {dir_name}")
-        except Exception as cleanup_error:
-            logging.warning(f"Error cleaning up temporary files: {str(cleanup_error)}")
-        
-        logging.info(f"Video generated successfully: {frontend_path}")
-        return frontend_path
-    except Exception as e:
-        logging.error(f"Error generating video: {str(e)}")
-        raise
-
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-logger = logging.getLogger(__name__)
-
-# Load environment variables
-load_dotenv()
-
-class MediaElement(BaseModel):
-    """Class for defining multimedia elements of a scene"""
-    image_prompt: str = Field(
-        description="Detailed prompt for image generation that captures the essence of the scene"
-    )
-    audio_narration: str = Field(
-        description="Text for text-to-speech narration that conveys the emotional tone of the scene"
-    )
-    background_music: str = Field(
-        default="ambient",
-        description="Type of background music for the scene (e.g., suspenseful, cheerful, melancholic)"
-    )
-    duration_seconds: float = Field(
-        default=5.0,
-        description="Suggested duration of this scene in seconds"
-    )
-
-class Scene(BaseModel):
-    """Class for defining a scene in the story"""
-    title: str = Field(
-        description="Short descriptive title for the scene"
-    )
-    description: str = Field(
-        description="Detailed description of what happens in the scene"
-    )
-    media: MediaElement = Field(
-        description="Multimedia elements for the scene"
-    )
-    transition: str = Field(
-        default="cut",
-        description="Transition to the next scene (e.g., fade, dissolve, cut)"
-    )
-
-class StoryResponse(BaseModel):
-    """Response model for generated story"""
-    title: str = Field(description="Title of the story")
-    theme: str = Field(description="Central theme of the story")
-    scenes: List[Scene] = Field(description="List of scenes that compose the story")
-    metadata: Dict[str, Any] = Field(
-        default_factory=dict,
-        description="Additional metadata about the generated story"
-    )
-    
-# Function to generate a story for video
-def generate_story_for_video(prompt: str, num_scenes: int = 5, style: Optional[str] = None, api_key: Optional[str] = None, format: str = "structured") -> Dict[str, Any]:
-    """
-    Wrapper function to generate a story for video production
-    
-    Args:
-        prompt: The user's story prompt
-        num_scenes: Suggested number of scenes
-        style: Optional style guidance
-        api_key: Optional OpenAI API key
-        format: Output format ("structured" or "legacy")
-        
-    Returns:
-        Dictionary containing the structured story
-    """
-    generator = StoryGenerator(api_key=api_key)
-    
-    if format.lower() == "legacy":
-        return generator.generate_story_legacy_format(prompt, num_scenes)
-    else:
-        story = generator.generate_story(prompt, num_scenes, style)
-        return story.dict()
-
-class StoryGenerator:
-    """Generates structured stories for automatic video creation"""
-    
-    def __init__(self, api_key: Optional[str] = None):
-        """Initialize the StoryGenerator with OpenAI API key"""
-        self._initialize_llm(api_key)
-        
-    def _initialize_llm(self, api_key: Optional[str] = None):
-        """Initialize the OpenAI client"""
-        try:
-            # Use provided API key or get from environment
-            if not api_key:
-                api_key = os.getenv("OPENAI_API_KEY")
-                
-            if not api_key:
-                raise ValueError("No OpenAI API key provided. Set OPENAI_API_KEY environment variable or pass api_key to constructor.")
-                
-            # Initialize OpenAI client
-            self.client = OpenAI(api_key=api_key)
-            self.model_name = os.getenv("OPENAI_MODEL", "gpt-4") or "gpt-4"
-            logger.info(f"LLM initialized successfully with model: {self.model_name}")
-        except Exception as e:
-            logger.error(f"Error initializing LLM: {str(e)}")
-            raise
-            
-    def _create_system_prompt(self) -> str:
-        """Create the system prompt for story generation"""
-        return """You are a creative storyteller and expert screenwriter specializing in creating engaging, visually compelling stories.
-
-Your task is to generate a structured story that can be converted into a video sequence. Each story should be divided into distinct scenes that flow naturally together to tell a cohesive story.
-
-For each scene, provide:
-1. A title that captures the essence of the scene
-2. A detailed description of what happens
-3. The setting (where and when the scene takes place)
-4. Characters present in the scene
-5. Multimedia elements:
-   - Image prompt: VERY detailed visual description for image generation with style, lighting, mood, colors, and details with proper syncronization with the audio narration, the next scene should be a continuation of the previous scene and the image prompt should be detailed enough accurately represent the continuation of the story in terms of the visual representation
-   - Audio narration: Engaging narrative text for voice-over that advances the story and conveys emotion
-   - Background music suggestion
-   - Suggested duration in seconds
-6. Transition to the next scene
-
-Important requirements:
-- Each scene's audio narration should continue the story from the previous scene
-- Audio narration should sound like a professional storyteller
-- Image prompts should be extremely detailed for high-quality generation
-- The story should have a clear beginning, middle, and end
-- The whole story when read through all scenes should feel cohesive and complete
-
-Your output will be used directly for automated video generation, so be specific about visual and audio elements."""
-
-    def _create_function_schema(self) -> Dict[str, Any]:
-        """Create the function schema for story generation"""
-        return {
-            "name": "generate_story",
-            "description": "Generate a structured story with scenes and multimedia elements for video creation",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "title": {
-                        "type": "string",
-                        "description": "Title of the story"
-                    },
-                    "theme": {
-                        "type": "string",
-                        "description": "Central theme of the story"
-                    },
-                    "scenes": {
-                        "type": "array",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "title": {
-                                    "type": "string",
-                                    "description": "Short descriptive title for the scene"
-                                },
-                                "description": {
-                                    "type": "string",
-                                    "description": "Detailed description of what happens in the scene"
-                                },
-                                "media": {
-                                    "type": "object",
-                                    "properties": {
-                                        "image_prompt": {
-                                            "type": "string",
-                                            "description": "Extremely detailed prompt for image generation that captures the essence of the scene with style, lighting, colors and mood details"
-                                        },
-                                        "audio_narration": {
-                                            "type": "string",
-                                            "description": "Engaging narrative text for voice-over that continues the story from the previous scene"
-                                        },
-                                        "background_music": {
-                                            "type": "string",
-                                            "description": "Type of background music for the scene (e.g., suspenseful, cheerful, melancholic)"
-                                        },
-                                        "duration_seconds": {
-                                            "type": "number",
-                                            "description": "Suggested duration of this scene in seconds"
-                                        }
-                                    },
-                                    "required": ["image_prompt", "audio_narration", "background_music", "duration_seconds"]
-                                },
-                                "transition": {
-                                    "type": "string",
-                                    "description": "Transition to the next scene (e.g., fade, dissolve, cut)"
-                                }
-                            },
-                            "required": ["title", "description", "media", "transition"]
-                        }
-                    },
-                },
-                "required": ["title", "theme", "scenes"]
-            }
-        }
-
-    def generate_story(self, prompt: str, num_scenes: int = 5, style: Optional[str] = None) -> StoryResponse:
-        """
-        Generate a structured story based on the input prompt
-        
-        Args:
-            prompt: The user's story prompt or request
-            num_scenes: Suggested number of scenes (default: 5)
-            style: Optional style guidance (e.g., "dramatic", "comedic")
-            
-        Returns:
-            StoryResponse object containing the structured story
-        """
-        try:
-            logger.info(f"Generating story for prompt: {prompt[:50]}...")
-            
-            # Prepare the messages
-            user_prompt = f"Create a story with approximately {num_scenes} scenes based on the following prompt: {prompt}"
-            if style:
-                user_prompt += f"\nThe story should be in a {style} style."
-                
-            user_prompt += "\n\nMake sure each scene flows naturally from the previous one, with audio narration that continues the story and image prompts that are extremely detailed for high-quality generation."
-                
-            messages = [
-                {"role": "system", "content": self._create_system_prompt()},
-                {"role": "user", "content": user_prompt}
-            ]
-            
-            # Call the OpenAI API with function calling
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=messages,
-                tools=[{"type": "function", "function": self._create_function_schema()}],
-                tool_choice={"type": "function", "function": {"name": "generate_story"}},
-                temperature=0.7,
-                max_tokens=3000
-            )
-            
-            # Extract and parse the function call
-            tool_call = response.choices[0].message.tool_calls[0]
-            if tool_call:
-                result = json.loads(tool_call.function.arguments)
-                
-                # Add metadata
-                if "metadata" not in result:
-                    result["metadata"] = {}
-                    
-                result["metadata"]["generation_timestamp"] = datetime.now().isoformat()
-                result["metadata"]["prompt"] = prompt
-                result["metadata"]["model"] = self.model_name
-                
-                # Convert to Pydantic model for validation
-                story_response = StoryResponse(**result)
-                logger.info(f"Successfully generated story '{story_response.title}' with {len(story_response.scenes)} scenes")
-                
-                return story_response
-            else:
-                raise ValueError("No function call in the response")
-                
-        except Exception as e:
-            logger.error(f"Error generating story: {str(e)}")
-            raise
-
-    def generate_story_legacy_format(self, message: str, num_scenes: int = 5) -> Dict[str, Any]:
-        """
-        Generate a story in the legacy format as per the provided template
-        
-        Args:
-            message: The user's story prompt or request
-            num_scenes: Suggested number of scenes
-            
-        Returns:
-            Dictionary in the legacy format with scenes
-        """
-        try:
-            # First generate structured story
-            story_response = self.generate_story(message, num_scenes)
-            
-            # Convert to legacy format
-            legacy_format = {"response": {}}
-            legacy_format["title"] = story_response.title
-            legacy_format["theme"] = story_response.theme
-            for i, scene in enumerate(story_response.scenes, 1):
-                scene_key = f"scene{i}"
-                legacy_format["response"][scene_key] = {
-                    "title": scene.title,
-                    "description": scene.description,
-                    "narration": scene.media.audio_narration,
-                    "image_prompt": scene.media.image_prompt,
-                    "background_music": scene.media.background_music,
-                    "duration_seconds": scene.media.duration_seconds
-                }
-            
-            return legacy_format
-            
-        except Exception as e:
-            logger.error(f"Error generating story in legacy format: {str(e)}")
-            raise
\ No newline at end of file
+import os
+import uuid
+import json
+import logging
+from typing import Callable, List, Dict, Any, Optional
+from pydantic import BaseModel, Field
+from datetime import datetime
+from dotenv import load_dotenv
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError, wait, FIRST_EXCEPTION
+
+from app.cache import image_cache, audio_cache, audio_cache_key, stable_hash
+from app.stories import story_cache_key, load_story, save_story
+from app.clients import clients
+from app.media import ffmpeg_manager, probe_duration
+from app.artifacts import artifact_store, link_file
+from app.metrics import stage, bind_context
+from app.executors import executors
+from app.rendering import fit_image, render_video_moviepy
+
+# Scene asset fan-out configuration
+SCENE_ASSET_CONCURRENCY = int(os.getenv("SCENE_ASSET_CONCURRENCY", "6"))
+ASSET_REQUEST_TIMEOUT = float(os.getenv("ASSET_REQUEST_TIMEOUT", "120"))
+
+# Resolution presets: output frame size and the DALL-E image size with the matching aspect ratio
+RESOLUTION_PRESETS = {
+    "720p": {"video_size": (1280, 720), "image_size": "1792x1024"},  # fast preview
+    "1080p": {"video_size": (1920, 1080), "image_size": "1792x1024"},
+    "vertical": {"video_size": (1080, 1920), "image_size": "1024x1792"},
+}
+VIDEO_RESOLUTION = os.getenv("VIDEO_RESOLUTION", "1080p")
+
+# Render engine configuration
+VIDEO_FPS = 30
+RENDER_ENGINES = ("ffmpeg", "ffmpeg_segments", "moviepy")
+RENDER_ENGINE = os.getenv("RENDER_ENGINE", "ffmpeg")
+SEGMENT_ENCODE_WORKERS = int(os.getenv("SEGMENT_ENCODE_WORKERS", str(os.cpu_count() or 1)))
+
+# Codec parameters shared by every scene segment so they can be joined with a stream copy
+SEGMENT_VIDEO_ARGS = ["-c:v", "libx264", "-preset", "veryfast", "-tune", "stillimage",
+                      "-profile:v", "high", "-pix_fmt", "yuv420p"]
+SEGMENT_AUDIO_ARGS = ["-c:a", "aac", "-b:a", "192k", "-ar", "44100", "-ac", "2"]
+
+def resolution_preset(resolution: Optional[str] = None) -> Dict[str, Any]:
+    """Return the preset for a resolution name (default: VIDEO_RESOLUTION)"""
+    resolution = resolution or VIDEO_RESOLUTION
+    if resolution not in RESOLUTION_PRESETS:
+        raise ValueError(f"Unknown resolution: {resolution}")
+    return RESOLUTION_PRESETS[resolution]
+
+def render_ready_image(original_path: str, original_key: str, video_size: tuple) -> str:
+    """
+    Return the render-ready JPEG of a generated image at the video size
+    
+    The variant is decoded, scaled (cropping the centre if the aspect ratio differs
+    slightly, never stretching) and encoded once, then kept in the image cache, so
+    renders never scale the image themselves.
+    
+    Args:
+        original_path: Path to the original image
+        original_key: Cache key of the original image
+        video_size: Target (width, height)
+        
+    Returns:
+        Path to the cached render-ready image
+    """
+    def convert(path):
+        with stage("image_resize"):
+            executors.call_cpu(fit_image, original_path, path, video_size)
+    
+    cache_key = stable_hash("render-ready", original_key, list(video_size))
+    return image_cache.get_or_create(cache_key, ".jpg", convert)
+
+def request_options(timeout: Optional[float]) -> Dict[str, Any]:
+    """Return the per-request SDK options; passing timeout=None would disable the client's own timeout"""
+    return {} if timeout is None else {"timeout": timeout}
+
+# Image generation class
+class ImageModel:
+    def __init__(self, client=None, resolution: Optional[str] = None):
+        # Request images in the aspect ratio of the output so they are scaled once, without distortion
+        preset = resolution_preset(resolution)
+        self.video_size = preset["video_size"]
+        self.image_size = preset["image_size"]
+        if client is not None:
+            # Injected client (e.g. a local fake of the OpenAI client)
+            self.client = client
+            return
+        logging.info("Initializing OpenAI client for image generation")
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY environment variable not set")
+        self.client = clients.openai(api_key)
+        logging.info("Initialized OpenAI client for image generation")
+
+    def generate_image_for_video(self, prompt: str, dir_name: str, img_name: str, timeout: Optional[float] = None,
+                                 cancelled: Optional[threading.Event] = None) -> str:
+        """Generate an image using OpenAI's DALL-E model; a set ``cancelled`` event drops the late result"""
+        logging.info(f"Generating image with prompt: {prompt[:50]}...")
+        try:
+            # Render with DALL-E, or reuse an earlier render of the same prompt and parameters
+            cache_key = stable_hash("dall-e-3", prompt, self.image_size, "standard", "original")
+            
+            def render(path):
+                with stage("image_generate"):
+                    response = self.client.images.generate(
+                        model="dall-e-3",
+                        prompt=prompt,
+                        size=self.image_size,
+                        quality="standard",
+                        n=1,
+                        **request_options(timeout)
+                    )
+                logging.info("Generated image for video")
+                raise_if_cancelled(cancelled)
+                
+                # Stream the PNG to disk as delivered, without decoding it
+                image_url = response.data[0].url
+                with stage("image_download") as span:
+                    span.add_bytes(clients.download_to(image_url, path, timeout=timeout))
+            
+            original_path = image_cache.get_or_create(cache_key, ".png", render)
+            render_path = render_ready_image(original_path, cache_key, self.video_size)
+            
+            # Link the cached render-ready image into the working directory instead of copying it
+            raise_if_cancelled(cancelled)
+            os.makedirs(dir_name, exist_ok=True)
+            image_path = f"{dir_name}/{img_name}.jpg"
+            link_file(render_path, image_path)
+            logging.info(f"Saved image to {image_path}")
+            
+            return image_path
+        except Exception as e:
+            logging.error(f"Error generating image: {str(e)}")
+            raise
+
+# Audio generation class
+class AudioModel:
+    def __init__(self, client=None):
+        if client is not None:
+            # Injected client (e.g. a local fake of the OpenAI client)
+            self.client = client
+            return
+        logging.info("Initializing OpenAI client for audio generation")
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY environment variable not set")
+        self.client = clients.openai(api_key)
+        logging.info("Initialized OpenAI client for audio generation")
+
+    def generate_audio_for_video(self, prompt: str, dir_name: str, audio_name: str, timeout: Optional[float] = None,
+                                 cancelled: Optional[threading.Event] = None) -> str:
+        """Generate audio using OpenAI's TTS model; a set ``cancelled`` event drops the late result"""
+        logging.info("Generating audio for video")
+        try:
+            # Ensure directory exists
+            os.makedirs(dir_name, exist_ok=True)
+            
+            # Synthesize with OpenAI TTS, or reuse an earlier identical narration segment
+            cache_key = audio_cache_key("openai", prompt, model="tts-1-hd", voice="shimmer", speed=0.90)
+            
+            def synthesize(path):
+                with stage("tts") as span:
+                    response = self.client.audio.speech.create(
+                        model="tts-1-hd",
+                        voice="shimmer",
+                        input=prompt,
+                        speed=0.90,
+                        **request_options(timeout)
+                    )
+                    logging.info("Generated audio for video")
+                    raise_if_cancelled(cancelled)
+                    
+                    with open(path, "wb") as audio_file:
+                        for chunk in response.iter_bytes():
+                            audio_file.write(chunk)
+                            span.add_bytes(len(chunk))
+            
+            cached_path = audio_cache.get_or_create(cache_key, ".mp3", synthesize)
+            
+            raise_if_cancelled(cancelled)
+            audio_path = f"{dir_name}/{audio_name}"
+            link_file(cached_path, audio_path)
+            logging.info(f"Saved audio to {audio_path}")
+            
+            return audio_path
+        except Exception as e:
+            logging.error(f"Error generating audio: {str(e)}")
+            raise
+
+# Scene asset fan-out
+def raise_if_cancelled(cancelled: Optional[threading.Event]):
+    """Abandon a scene asset request once its stage has been cancelled"""
+    if cancelled is not None and cancelled.is_set():
+        raise CancelledError()
+
+class SceneAssetStage:
+    """
+    Generates scene images and narration audio concurrently as scenes are submitted
+    
+    Image and TTS requests run on a pool bounded by ``max_concurrency``, each with a
+    per-call ``timeout``. After the first failure, requests that have not started
+    yet are cancelled, the error is raised without waiting for requests in flight,
+    and those drop their results at their next step instead of writing them.
+    Further submissions raise that error.
+    """
+
+    def __init__(self, dir_name: str, image_model: "ImageModel", audio_model: "AudioModel",
+                 max_concurrency: int = SCENE_ASSET_CONCURRENCY, timeout: Optional[float] = ASSET_REQUEST_TIMEOUT):
+        self.dir_name = dir_name
+        self.image_model = image_model
+        self.audio_model = audio_model
+        self.timeout = timeout
+        self.scene_numbers: List[int] = []
+        self._futures = []
+        self._cancelled = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="scene-assets")
+        os.makedirs(dir_name, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self._cancel()
+        else:
+            self._executor.shutdown(wait=True)
+
+    def _run(self, func, **kwargs):
+        # Skip work queued behind a failed scene
+        if self._cancelled.is_set():
+            raise CancelledError()
+        return func(timeout=self.timeout, cancelled=self._cancelled, **kwargs)
+
+    def _first_error(self) -> Optional[BaseException]:
+        for future in self._futures:
+            if future.done() and not future.cancelled() and future.exception():
+                return future.exception()
+        return None
+
+    def _cancel(self) -> int:
+        # In-flight requests see the event and stop; nobody waits for them
+        self._cancelled.set()
+        cancelled = sum(1 for future in self._futures if future.cancel())
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        return cancelled
+
+    def submit(self, scene_number: int, scene_data: Dict[str, Any]):
+        """Start the image and audio requests for one scene ("image_prompt" and "narration" keys)"""
+        error = self._first_error()
+        if error is not None:
+            raise error
+        self.scene_numbers.append(scene_number)
+        # Bound to the caller's context so the requests count towards the job's stage metrics
+        self._futures.append(self._executor.submit(
+            bind_context(self._run), self.image_model.generate_image_for_video,
+            prompt=scene_data["image_prompt"], dir_name=self.dir_name, img_name=f"scene_{scene_number}"
+        ))
+        self._futures.append(self._executor.submit(
+            bind_context(self._run), self.audio_model.generate_audio_for_video,
+            prompt=scene_data["narration"], dir_name=self.dir_name, audio_name=f"scene_{scene_number}.mp3"
+        ))
+
+    def wait(self) -> List[int]:
+        """
+        Wait for every submitted request
+        
+        Returns:
+            Scene numbers whose assets were generated, in submission order
+        """
+        done, not_done = wait(self._futures, return_when=FIRST_EXCEPTION)
+        error = self._first_error()
+        if error is not None:
+            cancelled = self._cancel()
+            logging.error(f"Scene asset generation failed, cancelled {cancelled} pending requests "
+                          f"and abandoned those in flight")
+            raise error
+        return list(self.scene_numbers)
+
+def generate_scene_assets(scenes: List[Dict[str, Any]], dir_name: str, image_model: "ImageModel",
+                          audio_model: "AudioModel", max_concurrency: int = SCENE_ASSET_CONCURRENCY,
+                          timeout: Optional[float] = ASSET_REQUEST_TIMEOUT,
+                          scene_numbers: Optional[List[int]] = None) -> List[int]:
+    """
+    Generate the image and narration audio for every scene concurrently
+    
+    All image and TTS requests for the story are issued at once, bounded by
+    ``max_concurrency``. If any request fails, the first error is raised at once:
+    requests that have not started yet are cancelled and requests in flight drop
+    their results. Each request is bounded by ``timeout``.
+    
+    Args:
+        scenes: Scene dictionaries with "image_prompt" and "narration" keys, in order
+        dir_name: Directory to save the scene assets
+        image_model: ImageModel used for the image requests
+        audio_model: AudioModel used for the TTS requests
+        max_concurrency: Maximum number of remote calls in flight
+        timeout: Per-call timeout in seconds
+        scene_numbers: Scene numbers used to name the assets (default: 1..len(scenes))
+        
+    Returns:
+        List of scene numbers (1-based) whose assets were generated
+    """
+    if scene_numbers is None:
+        scene_numbers = list(range(1, len(scenes) + 1))
+    logging.info(f"Generating assets for {len(scenes)} scenes with concurrency {max_concurrency}")
+    with SceneAssetStage(dir_name, image_model, audio_model, max_concurrency, timeout) as stage:
+        for i, scene_data in zip(scene_numbers, scenes):
+            stage.submit(i, scene_data)
+        stage.wait()
+    logging.info(f"Generated assets for {len(scenes)} scenes")
+    return scene_numbers
+
+# Render engines
+def render_video_ffmpeg(dir_name: str, scenes: list, output_path: str, video_size: tuple, fps: int,
+                        on_progress: Optional[Callable[[float], None]] = None):
+    """
+    Render the scenes with a single ffmpeg invocation
+    
+    Each still image is looped for the duration of its narration, scaled once by
+    ffmpeg's filter graph and concatenated with the audio, so no frame data passes
+    through Python. ``on_progress`` receives the completed fraction of the render.
+    """
+    width, height = video_size
+    command = ["-y", "-loglevel", "error"]
+    filters = []
+    concat_inputs = ""
+    total_duration = 0.0
+    for index, scene_num in enumerate(scenes):
+        audio_path = f"{dir_name}/scene_{scene_num}.mp3"
+        duration = probe_duration(audio_path)
+        total_duration += duration
+        logging.info(f"Processing scene {scene_num} ({duration:.2f}s)")
+        command += [
+            "-loop", "1", "-framerate", str(fps), "-t", f"{duration:.3f}",
+            "-i", f"{dir_name}/scene_{scene_num}.jpg",
+            "-i", audio_path,
+        ]
+        image_input, audio_input = 2 * index, 2 * index + 1
+        filters.append(f"[{image_input}:v]scale={width}:{height},setsar=1,format=yuv420p[v{index}]")
+        concat_inputs += f"[v{index}][{audio_input}:a]"
+    filters.append(f"{concat_inputs}concat=n={len(scenes)}:v=1:a=1[outv][outa]")
+    
+    command += [
+        "-filter_complex", ";".join(filters),
+        "-map", "[outv]", "-map", "[outa]",
+        "-r", str(fps),
+        "-c:v", "libx264", "-preset", "veryfast", "-tune", "stillimage",
+        "-c:a", "aac",
+        "-movflags", "+faststart",
+        output_path,
+    ]
+    logging.info("Rendering video with ffmpeg")
+    ffmpeg_manager.run(command, duration=total_duration, on_progress=on_progress, outputs=[output_path])
+
+def encode_scene_segment(image_path: str, audio_path: str, output_path: str, video_size: tuple, fps: int):
+    """Encode one scene (still image + narration) to its own segment file"""
+    width, height = video_size
+    duration = probe_duration(audio_path)
+    tmp_path = f"{output_path}.tmp.mp4"
+    command = [
+        "-y", "-loglevel", "error",
+        "-loop", "1", "-framerate", str(fps), "-t", f"{duration:.3f}", "-i", image_path,
+        "-i", audio_path,
+        "-vf", f"scale={width}:{height},setsar=1",
+        "-r", str(fps),
+        *SEGMENT_VIDEO_ARGS,
+        *SEGMENT_AUDIO_ARGS,
+        "-t", f"{duration:.3f}",
+        tmp_path,
+    ]
+    try:
+        with stage("segment_encode"):
+            ffmpeg_manager.run(command, outputs=[tmp_path])
+        # Only complete segments appear under the final name
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return output_path
+
+def concat_segments(segment_paths: List[str], output_path: str):
+    """Join encoded segments with the concat demuxer, copying the streams without re-encoding"""
+    list_path = f"{output_path}.segments.txt"
+    with open(list_path, "w") as list_file:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            list_file.write(f"file '{escaped}'\n")
+    try:
+        with stage("concat"):
+            ffmpeg_manager.run(
+                ["-y", "-loglevel", "error", "-f", "concat", "-safe", "0", "-i", list_path,
+                 "-c", "copy", "-movflags", "+faststart", output_path],
+                outputs=[output_path]
+            )
+    finally:
+        os.remove(list_path)
+
+def render_video_segments(dir_name: str, scenes: list, output_path: str, video_size: tuple, fps: int,
+                          max_workers: int = SEGMENT_ENCODE_WORKERS) -> List[str]:
+    """
+    Encode every scene to its own segment in parallel, then stream-copy them together
+    
+    Each segment is encoded by a separate ffmpeg process, so up to ``max_workers``
+    scenes encode on separate cores at once; the final join does not re-encode.
+    
+    Returns:
+        Paths of the encoded scene segments
+    """
+    segment_paths = [f"{dir_name}/segment_{scene_num}.mp4" for scene_num in scenes]
+    logging.info(f"Encoding {len(scenes)} scene segments with {max_workers} workers")
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="segment-encode") as executor:
+        futures = [
+            executor.submit(bind_context(encode_scene_segment), f"{dir_name}/scene_{scene_num}.jpg",
+                            f"{dir_name}/scene_{scene_num}.mp3", segment_path, video_size, fps)
+            for scene_num, segment_path in zip(scenes, segment_paths)
+        ]
+        for future in futures:
+            future.result()
+    
+    logging.info("Concatenating scene segments")
+    concat_segments(segment_paths, output_path)
+    return segment_paths
+
+# Video synchronization function
+def generate_video(video_store: str, dir_name: str, scenes: list, output_name: str = "video.mp4",
+                   render_engine: Optional[str] = None, resolution: Optional[str] = None,
+                   on_progress: Optional[Callable[[float], None]] = None) -> str:
+    """
+    Generate a video by combining images and audio for each scene
+    
+    Args:
+        video_store: Artifact store directory for the final video
+        dir_name: Directory containing the scene images and audio
+        scenes: List of scene numbers to include in the video
+        output_name: Name of the output video file (default: video.mp4)
+        render_engine: "ffmpeg", "ffmpeg_segments" or "moviepy" (default: RENDER_ENGINE)
+        resolution: Resolution preset, "720p", "1080p" or "vertical" (default: VIDEO_RESOLUTION)
+        on_progress: Optional callback receiving the completed fraction of the render (ffmpeg engine)
+        
+    Returns:
+        Path to the generated video
+    """
+    try:
+        render_engine = render_engine or RENDER_ENGINE
+        if render_engine not in RENDER_ENGINES:
+            raise ValueError(f"Unknown render engine: {render_engine}")
+        logging.info(f"Generating video with {len(scenes)} scenes using {render_engine}")
+        
+        video_size = resolution_preset(resolution)["video_size"]
+        fps = VIDEO_FPS
+        
+        # Ensure directory exists
+        os.makedirs(dir_name, exist_ok=True)
+        
+        # Ensure video store directory exists
+        os.makedirs(video_store, exist_ok=True)
+
+        # Render straight into the artifact store; the video is written only once
+        output_path = f"{video_store}/{output_name}"
+
+        if render_engine != "moviepy" and not (shutil.which("ffmpeg") and shutil.which("ffprobe")):
+            logging.warning("ffmpeg not found, falling back to the MoviePy render engine")
+            render_engine = "moviepy"
+        
+        segment_paths = []
+        with stage(f"render_{render_engine}") as span:
+            if render_engine == "ffmpeg":
+                render_video_ffmpeg(dir_name, scenes, output_path, video_size, fps, on_progress)
+            elif render_engine == "ffmpeg_segments":
+                segment_paths = render_video_segments(dir_name, scenes, output_path, video_size, fps)
+            else:
+                # MoviePy renders frame by frame in Python, so it runs in the CPU process pool
+                executors.call_cpu(render_video_moviepy, dir_name, scenes, output_path, video_size, fps)
+            span.add_bytes(os.path.getsize(output_path))
+        
+        # Clean up temporary files (images and audio)
+        try:
+            for scene_num in scenes:
+                # Remove image and audio files
+                image_path = f"{dir_name}/scene_{scene_num}.jpg"
+                audio_path = f"{dir_name}/scene_{scene_num}.mp3"
+                
+                if os.path.exists(image_path):
+                    os.remove(image_path)
+                    logging.info(f"Removed temporary image: {image_path}")
+                    
+                if os.path.exists(audio_path):
+                    os.remove(audio_path)
+                    logging.info(f"Removed temporary audio: {audio_path}")
+            
+            for segment_path in segment_paths:
+                if os.path.exists(segment_path):
+                    os.remove(segment_path)
+            
+            # The working directory only held intermediates
+            if os.path.isdir(dir_name) and not os.listdir(dir_name):
+                os.rmdir(dir_name)
+            logging.info(f"Cleaned up temporary files in {dir_name}")
+        except Exception as cleanup_error:
+            logging.warning(f"Error cleaning up temporary files: {str(cleanup_error)}")
+        
+        artifact_store.register(output_path)
+        logging.info(f"Video generated successfully: {output_path}")
+        return output_path
+    except Exception as e:
+        logging.error(f"Error generating video: {str(e)}")
+        raise
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+
+class MediaElement(BaseModel):
+    """Class for defining multimedia elements of a scene"""
+    image_prompt: str = Field(
+        description="Detailed prompt for image generation that captures the essence of the scene"
+    )
+    audio_narration: str = Field(
+        description="Text for text-to-speech narration that conveys the emotional tone of the scene"
+    )
+    background_music: str = Field(
+        default="ambient",
+        description="Type of background music for the scene (e.g., suspenseful, cheerful, melancholic)"
+    )
+    duration_seconds: float = Field(
+        default=5.0,
+        description="Suggested duration of this scene in seconds"
+    )
+
+class Scene(BaseModel):
+    """Class for defining a scene in the story"""
+    title: str = Field(
+        description="Short descriptive title for the scene"
+    )
+    description: str = Field(
+        description="Detailed description of what happens in the scene"
+    )
+    media: MediaElement = Field(
+        description="Multimedia elements for the scene"
+    )
+    transition: str = Field(
+        default="cut",
+        description="Transition to the next scene (e.g., fade, dissolve, cut)"
+    )
+
+class StoryResponse(BaseModel):
+    """Response model for generated story"""
+    title: str = Field(description="Title of the story")
+    theme: str = Field(description="Central theme of the story")
+    scenes: List[Scene] = Field(description="List of scenes that compose the story")
+    metadata: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="Additional metadata about the generated story"
+    )
+    
+# Function to generate a story for video
+def generate_story_for_video(prompt: str, num_scenes: int = 5, style: Optional[str] = None, api_key: Optional[str] = None, format: str = "structured") -> Dict[str, Any]:
+    """
+    Wrapper function to generate a story for video production
+    
+    Args:
+        prompt: The user's story prompt
+        num_scenes: Suggested number of scenes
+        style: Optional style guidance
+        api_key: Optional OpenAI API key
+        format: Output format ("structured" or "legacy")
+        
+    Returns:
+        Dictionary containing the structured story
+    """
+    generator = StoryGenerator(api_key=api_key)
+    
+    if format.lower() == "legacy":
+        return generator.generate_story_legacy_format(prompt, num_scenes)
+    else:
+        story = generator.generate_story(prompt, num_scenes, style)
+        return story.dict()
+
+def story_to_legacy_format(story_response: StoryResponse) -> Dict[str, Any]:
+    """Convert a structured story to the legacy scene dictionary format"""
+    legacy_format = {"response": {}}
+    legacy_format["title"] = story_response.title
+    legacy_format["theme"] = story_response.theme
+    legacy_format["story_id"] = story_response.metadata.get("story_id")
+    for i, scene in enumerate(story_response.scenes, 1):
+        scene_key = f"scene{i}"
+        legacy_format["response"][scene_key] = {
+            "title": scene.title,
+            "description": scene.description,
+            "narration": scene.media.audio_narration,
+            "image_prompt": scene.media.image_prompt,
+            "background_music": scene.media.background_music,
+            "duration_seconds": scene.media.duration_seconds
+        }
+    return legacy_format
+
+class SceneStreamParser:
+    """
+    Incremental parser that extracts complete scene objects from streamed story JSON
+    
+    Text fragments of the ``generate_story`` tool-call arguments are fed in as they
+    arrive; each call to ``feed`` returns the scene objects of the top-level
+    ``scenes`` array that were completed by that fragment.
+    """
+
+    def __init__(self):
+        self.scene_count = 0
+        self._buffer = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string = None
+        self._key = None
+        self._scenes_depth = None
+        self._scene_start = None
+
+    def feed(self, fragment: str) -> List[Dict[str, Any]]:
+        """Consume a fragment and return the scenes it completed"""
+        self._buffer += fragment
+        scenes = []
+        buffer = self._buffer
+        for i in range(self._pos, len(buffer)):
+            c = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    self._last_string = buffer[self._string_start + 1:i]
+                continue
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == ":" and self._stack == ["{"]:
+                # Key of the top-level story object
+                self._key = self._last_string
+            elif c in "{[":
+                if c == "[" and self._stack == ["{"] and self._key == "scenes":
+                    self._scenes_depth = 2
+                self._stack.append(c)
+                if c == "{" and self._scenes_depth and len(self._stack) == self._scenes_depth + 1:
+                    self._scene_start = i
+            elif c in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if c == "}" and self._scene_start is not None and self._scenes_depth and len(self._stack) == self._scenes_depth:
+                    scenes.append(json.loads(buffer[self._scene_start:i + 1]))
+                    self._scene_start = None
+                    self.scene_count += 1
+                elif c == "]" and self._scenes_depth and len(self._stack) < self._scenes_depth:
+                    self._scenes_depth = None
+        self._pos = len(buffer)
+        return scenes
+
+class StoryGenerator:
+    """Generates structured stories for automatic video creation"""
+    
+    def __init__(self, api_key: Optional[str] = None, client=None):
+        """Initialize the StoryGenerator with OpenAI API key, or an injected client"""
+        self._initialize_llm(api_key, client)
+        
+    def _initialize_llm(self, api_key: Optional[str] = None, client=None):
+        """Initialize the OpenAI client"""
+        try:
+            if client is not None:
+                # Injected client (e.g. a local fake replaying a recorded stream)
+                self.client = client
+                self.model_name = os.getenv("OPENAI_MODEL", "gpt-4") or "gpt-4"
+                return
+            
+            # Use provided API key or get from environment
+            if not api_key:
+                api_key = os.getenv("OPENAI_API_KEY")
+                
+            if not api_key:
+                raise ValueError("No OpenAI API key provided. Set OPENAI_API_KEY environment variable or pass api_key to constructor.")
+                
+            # Initialize OpenAI client
+            self.client = clients.openai(api_key)
+            self.model_name = os.getenv("OPENAI_MODEL", "gpt-4") or "gpt-4"
+            logger.info(f"LLM initialized successfully with model: {self.model_name}")
+        except Exception as e:
+            logger.error(f"Error initializing LLM: {str(e)}")
+            raise
+            
+    def _create_system_prompt(self) -> str:
+        """Create the system prompt for story generation"""
+        return """You are a creative storyteller and expert screenwriter specializing in creating engaging, visually compelling stories.
+
+Your task is to generate a structured story that can be converted into a video sequence. Each story should be divided into distinct scenes that flow naturally together to tell a cohesive story.
+
+For each scene, provide:
+1. A title that captures the essence of the scene
+2. A detailed description of what happens
+3. The setting (where and when the scene takes place)
+4. Characters present in the scene
+5. Multimedia elements:
+   - Image prompt: VERY detailed visual description for image generation with style, lighting, mood, colors, and details with proper syncronization with the audio narration, the next scene should be a continuation of the previous scene and the image prompt should be detailed enough accurately represent the continuation of the story in terms of the visual representation
+   - Audio narration: Engaging narrative text for voice-over that advances the story and conveys emotion
+   - Background music suggestion
+   - Suggested duration in seconds
+6. Transition to the next scene
+
+Important requirements:
+- Each scene's audio narration should continue the story from the previous scene
+- Audio narration should sound like a professional storyteller
+- Image prompts should be extremely detailed for high-quality generation
+- The story should have a clear beginning, middle, and end
+- The whole story when read through all scenes should feel cohesive and complete
+
+Your output will be used directly for automated video generation, so be specific about visual and audio elements."""
+
+    def _create_function_schema(self) -> Dict[str, Any]:
+        """Create the function schema for story generation"""
+        return {
+            "name": "generate_story",
+            "description": "Generate a structured story with scenes and multimedia elements for video creation",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "title": {
+                        "type": "string",
+                        "description": "Title of the story"
+                    },
+                    "theme": {
+                        "type": "string",
+                        "description": "Central theme of the story"
+                    },
+                    "scenes": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "title": {
+                                    "type": "string",
+                                    "description": "Short descriptive title for the scene"
+                                },
+                                "description": {
+                                    "type": "string",
+                                    "description": "Detailed description of what happens in the scene"
+                                },
+                                "media": {
+                                    "type": "object",
+                                    "properties": {
+                                        "image_prompt": {
+                                            "type": "string",
+                                            "description": "Extremely detailed prompt for image generation that captures the essence of the scene with style, lighting, colors and mood details"
+                                        },
+                                        "audio_narration": {
+                                            "type": "string",
+                                            "description": "Engaging narrative text for voice-over that continues the story from the previous scene"
+                                        },
+                                        "background_music": {
+                                            "type": "string",
+                                            "description": "Type of background music for the scene (e.g., suspenseful, cheerful, melancholic)"
+                                        },
+                                        "duration_seconds": {
+                                            "type": "number",
+                                            "description": "Suggested duration of this scene in seconds"
+                                        }
+                                    },
+                                    "required": ["image_prompt", "audio_narration", "background_music", "duration_seconds"]
+                                },
+                                "transition": {
+                                    "type": "string",
+                                    "description": "Transition to the next scene (e.g., fade, dissolve, cut)"
+                                }
+                            },
+                            "required": ["title", "description", "media", "transition"]
+                        }
+                    },
+                },
+                "required": ["title", "theme", "scenes"]
+            }
+        }
+
+    def generate_story(self, prompt: str, num_scenes: int = 5, style: Optional[str] = None,
+                       use_cache: bool = True) -> StoryResponse:
+        """
+        Generate a structured story based on the input prompt
+        
+        Generated stories are stored under an ID derived from (model, prompt,
+        num_scenes, style), so repeating a request reuses the stored story instead
+        of calling the LLM again.
+        
+        Args:
+            prompt: The user's story prompt or request
+            num_scenes: Suggested number of scenes (default: 5)
+            style: Optional style guidance (e.g., "dramatic", "comedic")
+            use_cache: Reuse a previously generated story for the same inputs
+            
+        Returns:
+            StoryResponse object containing the structured story
+        """
+        try:
+            story_id = story_cache_key(self.model_name, prompt, num_scenes, style)
+            if use_cache:
+                cached = load_story(story_id)
+                if cached:
+                    logger.info(f"Using stored story {story_id} for prompt: {prompt[:50]}...")
+                    return StoryResponse(**cached)
+            
+            logger.info(f"Generating story for prompt: {prompt[:50]}...")
+            
+            # Call the OpenAI API with function calling
+            with stage("story_llm"):
+                response = self.client.chat.completions.create(
+                    model=self.model_name,
+                    messages=self._create_messages(prompt, num_scenes, style),
+                    tools=[{"type": "function", "function": self._create_function_schema()}],
+                    tool_choice={"type": "function", "function": {"name": "generate_story"}},
+                    temperature=0.7,
+                    max_tokens=3000
+                )
+            
+            # Extract and parse the function call
+            tool_call = response.choices[0].message.tool_calls[0]
+            if tool_call:
+                return self._finalize_story(tool_call.function.arguments, prompt, story_id)
+            else:
+                raise ValueError("No function call in the response")
+                
+        except Exception as e:
+            logger.error(f"Error generating story: {str(e)}")
+            raise
+
+    def generate_story_streaming(self, prompt: str, num_scenes: int = 5, style: Optional[str] = None,
+                                 on_scene: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+                                 use_cache: bool = True) -> StoryResponse:
+        """
+        Generate a story with a streamed completion, handing out scenes as they arrive
+        
+        The tool-call arguments are parsed incrementally, and ``on_scene`` is called
+        with the scene number and scene dictionary as soon as each scene object in
+        the ``scenes`` array is complete, while the model is still writing the rest.
+        
+        Args:
+            prompt: The user's story prompt or request
+            num_scenes: Suggested number of scenes (default: 5)
+            style: Optional style guidance (e.g., "dramatic", "comedic")
+            on_scene: Callback receiving ``(scene_number, scene)`` for each completed scene
+            use_cache: Reuse a previously generated story for the same inputs
+            
+        Returns:
+            StoryResponse object containing the complete structured story
+        """
+        if on_scene is None:
+            on_scene = lambda scene_number, scene: None
+        try:
+            story_id = story_cache_key(self.model_name, prompt, num_scenes, style)
+            if use_cache:
+                cached = load_story(story_id)
+                if cached:
+                    logger.info(f"Using stored story {story_id} for prompt: {prompt[:50]}...")
+                    story_response = StoryResponse(**cached)
+                    for i, scene in enumerate(story_response.scenes, 1):
+                        on_scene(i, scene.dict())
+                    return story_response
+            
+            logger.info(f"Streaming story for prompt: {prompt[:50]}...")
+            parser = SceneStreamParser()
+            arguments = []
+            with stage("story_llm_stream"):
+                stream = self.client.chat.completions.create(
+                    model=self.model_name,
+                    messages=self._create_messages(prompt, num_scenes, style),
+                    tools=[{"type": "function", "function": self._create_function_schema()}],
+                    tool_choice={"type": "function", "function": {"name": "generate_story"}},
+                    temperature=0.7,
+                    max_tokens=3000,
+                    stream=True
+                )
+                
+                for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    tool_calls = chunk.choices[0].delta.tool_calls
+                    if not tool_calls or not tool_calls[0].function or not tool_calls[0].function.arguments:
+                        continue
+                    fragment = tool_calls[0].function.arguments
+                    arguments.append(fragment)
+                    for scene in parser.feed(fragment):
+                        logger.info(f"Scene {parser.scene_count} received from stream")
+                        on_scene(parser.scene_count, scene)
+            
+            if not arguments:
+                raise ValueError("No function call in the response")
+            return self._finalize_story("".join(arguments), prompt, story_id)
+            
+        except Exception as e:
+            logger.error(f"Error streaming story: {str(e)}")
+            raise
+
+    def _create_messages(self, prompt: str, num_scenes: int, style: Optional[str]) -> List[Dict[str, str]]:
+        """Create the chat messages for story generation"""
+        user_prompt = f"Create a story with approximately {num_scenes} scenes based on the following prompt: {prompt}"
+        if style:
+            user_prompt += f"\nThe story should be in a {style} style."
+            
+        user_prompt += "\n\nMake sure each scene flows naturally from the previous one, with audio narration that continues the story and image prompts that are extremely detailed for high-quality generation."
+            
+        return [
+            {"role": "system", "content": self._create_system_prompt()},
+            {"role": "user", "content": user_prompt}
+        ]
+
+    def _finalize_story(self, arguments: str, prompt: str, story_id: str) -> StoryResponse:
+        """Parse the tool-call arguments, add metadata, validate and store the story"""
+        result = json.loads(arguments)
+        
+        # Add metadata
+        if "metadata" not in result:
+            result["metadata"] = {}
+            
+        result["metadata"]["generation_timestamp"] = datetime.now().isoformat()
+        result["metadata"]["prompt"] = prompt
+        result["metadata"]["model"] = self.model_name
+        result["metadata"]["story_id"] = story_id
+        
+        # Convert to Pydantic model for validation
+        story_response = StoryResponse(**result)
+        save_story(story_response.dict(), story_id)
+        logger.info(f"Successfully generated story '{story_response.title}' with {len(story_response.scenes)} scenes")
+        
+        return story_response
+
+    def generate_story_legacy_format(self, message: str, num_scenes: int = 5) -> Dict[str, Any]:
+        """
+        Generate a story in the legacy format as per the provided template
+        
+        Args:
+            message: The user's story prompt or request
+            num_scenes: Suggested number of scenes
+            
+        Returns:
+            Dictionary in the legacy format with scenes
+        """
+        try:
+            # First generate structured story
+            story_response = self.generate_story(message, num_scenes)
+            
+            # Convert to legacy format
+            legacy_format = story_to_legacy_format(story_response)
+            
+            return legacy_format
+            
+        except Exception as e:
+            logger.error(f"Error generating story in legacy format: {str(e)}")
+            raise
+
+def narration_for_language(narration: str, target_language: str) -> str:
+    """Return the narration to synthesize for the target language"""
+    # Generate audio with translation if needed
+    if target_language and target_language != "en":
+        # Here you'd translate the narration first
+        # For simplicity, we're using the original text
+        return narration  # Replace with actual translation
+    return narration
+
+def generate_video_from_prompt(prompt: Optional[str] = None, target_language: str = "en", story: Optional[str] = None,
+                               story_id: Optional[str] = None, structured_story: Optional[Dict[str, Any]] = None,
+                               dir_name: Optional[str] = None, render_engine: Optional[str] = None,
+                               stream_story: bool = False, resolution: Optional[str] = None,
+                               progress=None) -> Dict[str, Any]:
+    """
+    Run the full video generation pipeline: story, scene images and audio, render
+    
+    The story comes from ``structured_story`` if given (it is stored for later
+    re-renders), else from the stored story ``story_id``, else it is generated
+    from ``prompt``. With ``stream_story`` the generated story is streamed and each
+    scene's assets start as soon as the scene arrives.
+    
+    Args:
+        prompt: The user's video prompt
+        target_language: Target language code for narration
+        story: Optional story text supplied with the request
+        story_id: Optional ID of a stored story to render
+        structured_story: Optional story in the StoryResponse shape to render
+        dir_name: Working directory for scene assets (default: unique per call)
+        render_engine: "ffmpeg", "ffmpeg_segments" or "moviepy" (default: RENDER_ENGINE)
+        stream_story: Stream the story and overlap asset generation with the LLM call
+        resolution: Resolution preset, "720p", "1080p" or "vertical" (default: VIDEO_RESOLUTION)
+        progress: Optional callback ``progress(stage, fraction)`` for status reporting
+        
+    Returns:
+        Dictionary with the frontend URL of the generated video and its project and story IDs
+    """
+    if progress is None:
+        progress = lambda stage, fraction: None
+    if not dir_name:
+        dir_name = f"video_{uuid.uuid4().hex}"
+    
+    progress("story", 0.0)
+    assets_ready = False
+    if structured_story is not None:
+        # Render the supplied story without calling the LLM
+        story_response = StoryResponse(**structured_story)
+        story_response.metadata["story_id"] = save_story(story_response.dict())
+        story_data = story_to_legacy_format(story_response)
+    elif story_id:
+        stored = load_story(story_id)
+        if stored is None:
+            raise ValueError(f"Story {story_id} not found")
+        story_data = story_to_legacy_format(StoryResponse(**stored))
+    elif stream_story:
+        # Start each scene's image and audio as soon as the scene arrives from the stream
+        with SceneAssetStage(dir_name, ImageModel(resolution=resolution), AudioModel()) as stage:
+            story_response = StoryGenerator().generate_story_streaming(
+                prompt,
+                num_scenes=3,  # Default number of scenes
+                style="informative" if not story else None,
+                on_scene=lambda scene_number, scene: stage.submit(scene_number, {
+                    "image_prompt": scene["media"]["image_prompt"],
+                    "narration": narration_for_language(scene["media"]["audio_narration"], target_language)
+                })
+            )
+            stage.wait()
+        story_data = story_to_legacy_format(story_response)
+        assets_ready = True
+    else:
+        # Generate story based on prompt
+        story_data = generate_story_for_video(
+            prompt=prompt,
+            num_scenes=3,  # Default number of scenes
+            style="informative" if not story else None,
+            format="legacy"
+        )
+    
+    scene_items = [
+        {"image_prompt": scene_data["image_prompt"],
+         "narration": narration_for_language(scene_data["narration"], target_language)}
+        for scene_data in story_data["response"].values()
+    ]
+    
+    # Keep the story as a project so edited scenes can be re-rendered incrementally
+    from app.projects import create_project, render_project
+    project_id = uuid.uuid4().hex
+    if (render_engine or RENDER_ENGINE) == "ffmpeg_segments":
+        if assets_ready:
+            # Streamed assets are in the caches now; the project renders from there
+            shutil.rmtree(dir_name, ignore_errors=True)
+        result = render_project(project_id, scene_items, target_language, story_data.get("title"),
+                                resolution=resolution, progress=progress)
+        result["story_id"] = story_data.get("story_id")
+        return result
+    create_project(scene_items, target_language, story_data.get("title"), project_id, resolution)
+    
+    try:
+        # Generate images and audio for all scenes concurrently
+        progress("scene_assets", 0.1)
+        if assets_ready:
+            scenes = list(range(1, len(scene_items) + 1))
+        else:
+            scenes = generate_scene_assets(scene_items, dir_name, ImageModel(resolution=resolution), AudioModel())
+        
+        # Combine everything into video
+        progress("render", 0.7)
+        video_store = os.path.dirname(artifact_store.path("temp_videos", dir_name, "video.mp4"))
+        video_path = generate_video(video_store, dir_name, scenes, render_engine=render_engine, resolution=resolution,
+                                    on_progress=lambda fraction: progress("render", 0.7 + 0.3 * fraction))
+    finally:
+        # The working directory only holds intermediates, on success and failure alike
+        shutil.rmtree(dir_name, ignore_errors=True)
+    
+    return {"video_url": artifact_store.url(video_path), "project_id": project_id,
+            "story_id": story_data.get("story_id")}
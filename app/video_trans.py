@@ -1,167 +1,364 @@
-import openai
-import os
-import subprocess
-import logging
-from deep_translator import GoogleTranslator
-from gtts import gTTS
-import moviepy
-from moviepy import ImageClip, AudioFileClip, concatenate_videoclips, VideoFileClip
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-logger = logging.getLogger(__name__)
-
-# Create output directory
-OUTPUT_DIR = "output"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-def extract_audio(video_path, audio_path):
-    """Extract audio from a video file"""
-    try:
-        logger.info(f"Extracting audio from {video_path}")
-        command = f"ffmpeg -i \"{video_path}\" -q:a 0 -map a \"{audio_path}\" -y"
-        subprocess.run(command, shell=True, check=True)
-        logger.info(f"Audio extracted to {audio_path}")
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error extracting audio: {str(e)}")
-        raise
-
-import openai
-
-def transcribe_audio(audio_path, openai_api_key=None):
-    """Transcribe audio using OpenAI Whisper API (latest openai>=1.x)"""
-    try:
-        logger.info(f"Transcribing audio from {audio_path}")
-        
-        if not openai_api_key:
-            openai_api_key = os.getenv("OPENAI_API_KEY")
-            if not openai_api_key:
-                raise ValueError("OPENAI_API_KEY not provided and not found in environment")
-        
-        client = openai.OpenAI(api_key=openai_api_key)
-        
-        with open(audio_path, "rb") as audio_file:
-            response = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file
-            )
-        
-        transcribed_text = response.text
-        logger.info(f"Transcription completed: {transcribed_text[:50]}...")
-        return transcribed_text
-    
-    except Exception as e:
-        logger.error(f"Error transcribing audio: {str(e)}")
-        raise
-
-
-def translate_text(text, target_language):
-    """Translate text to target language"""
-    try:
-        logger.info(f"Translating text to {target_language}")
-        translated_text = GoogleTranslator(source='auto', target=target_language).translate(text)
-        logger.info(f"Translation completed: {translated_text[:50]}...")
-        return translated_text
-    except Exception as e:
-        logger.error(f"Error translating text: {str(e)}")
-        raise
-
-def text_to_speech(text, lang, output_audio):
-    """Convert text to speech"""
-    try:
-        logger.info(f"Converting text to speech in {lang}")
-        tts = gTTS(text, lang=lang)
-        tts.save(output_audio)
-        logger.info(f"Speech saved to {output_audio}")
-    except Exception as e:
-        logger.error(f"Error converting text to speech: {str(e)}")
-        raise
-
-def replace_audio(video_path, new_audio_path, output_video):
-    """Replace the audio in a video with a new audio track"""
-    try:
-        logger.info(f"Replacing audio in {video_path}")
-        # Add the -y flag to automatically overwrite existing files without prompting
-        command = f"ffmpeg -i \"{video_path}\" -i \"{new_audio_path}\" -c:v copy -map 0:v:0 -map 1:a:0 -shortest \"{output_video}\" -y"
-        subprocess.run(command, shell=True, check=True)
-        logger.info(f"Video with replaced audio saved to {output_video}")
-    except subprocess.CalledProcessError as e:
-        logger.error(f"Error replacing audio: {str(e)}")
-        raise
-
-def process_video(video_path, target_language, openai_api_key=None):
-    """
-    Process a video by translating its audio to the target language
-    
-    Args:
-        video_path: Path to the input video
-        target_language: Target language code (e.g., 'es', 'fr', 'hi')
-        openai_api_key: OpenAI API key (optional, will use env var if not provided)
-        
-    Returns:
-        Dictionary with paths to the output files
-    """
-    try:
-        logger.info(f"Processing video: {video_path} to {target_language}")
-        
-        # Create unique directory for this translation
-        timestamp = os.path.basename(video_path).split('.')[0]
-        output_dir = os.path.join(OUTPUT_DIR, f"translation_{timestamp}")
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # Also create directory in public folder for frontend access
-        frontend_dir = os.path.join("UI", "public", "temp_translations", f"translation_{timestamp}")
-        os.makedirs(frontend_dir, exist_ok=True)
-        
-        # Define file paths
-        original_audio = os.path.join(output_dir, "original_audio.mp3")
-        translated_audio = os.path.join(output_dir, "translated_audio.mp3")
-        output_video_path = os.path.join(output_dir, "translated_video.mp4")
-        
-        # Frontend paths
-        frontend_original_audio = os.path.join(frontend_dir, "original_audio.mp3")
-        frontend_translated_audio = os.path.join(frontend_dir, "translated_audio.mp3")
-        frontend_output_video = os.path.join(frontend_dir, "translated_video.mp4")
-        
-        # Extract audio from the video
-        extract_audio(video_path, original_audio)
-        
-        # Transcribe the audio
-        transcript = transcribe_audio(original_audio, openai_api_key)
-        
-        # Translate the transcript
-        translated_text = translate_text(transcript, target_language)
-        
-        # Convert the translated text to speech
-        text_to_speech(translated_text, target_language, translated_audio)
-        
-        # Replace the audio in the video
-        replace_audio(video_path, translated_audio, output_video_path)
-        
-        # Copy files to frontend directory
-        import shutil
-        shutil.copy(original_audio, frontend_original_audio)
-        shutil.copy(translated_audio, frontend_translated_audio)
-        shutil.copy(output_video_path, frontend_output_video)
-        
-        # Clean up the temporary video file
-        if os.path.exists(video_path):
-            os.remove(video_path)
-            logger.info(f"Removed temporary video file: {video_path}")
-        
-        # Return paths for the main.py endpoint
-        return {
-            "output_path": output_video_path,
-            "original_audio": original_audio,
-            "translated_audio": translated_audio,
-            "frontend_paths": {
-                "video": f"/temp_translations/translation_{timestamp}/translated_video.mp4",
-                "original_audio": f"/temp_translations/translation_{timestamp}/original_audio.mp3",
-                "translated_audio": f"/temp_translations/translation_{timestamp}/translated_audio.mp3"
-            }
-        }
-    except Exception as e:
-        logger.error(f"Error processing video: {str(e)}")
-        # Clean up any temporary files
-        if os.path.exists(video_path):
-            os.remove(video_path)
-        raise
\ No newline at end of file
+import os
+import shutil
+import subprocess
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from gtts import gTTS
+
+from app.cache import audio_cache, audio_cache_key
+from app.transcription import (TRANSCRIPTION_BACKEND, TRANSCRIBABLE_CODECS, get_transcription_backend,
+                               transcribe_in_chunks)
+from app.translation import translate_texts
+from app.artifacts import artifact_store, link_file
+from app.metrics import stage, bind_context
+from app.media import (ffmpeg_manager, probe_duration, probe_audio_stream, copy_audio_stream,
+                       fit_audio_to_slot, mix_audio_at_offsets)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Create output directory
+OUTPUT_DIR = "output"
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+# Dubbing configuration
+DUB_CONCURRENCY = int(os.getenv("DUB_CONCURRENCY", "8"))
+MAX_DUB_TEMPO = float(os.getenv("MAX_DUB_TEMPO", "1.6"))
+LANGUAGE_CONCURRENCY = int(os.getenv("LANGUAGE_CONCURRENCY", "4"))
+DUB_AUDIO_BITRATE = os.getenv("DUB_AUDIO_BITRATE", "192k")
+
+# Codec of the dubbed track in the MP4 output
+DUB_AUDIO_ARGS = ["-c:a", "aac", "-b:a", DUB_AUDIO_BITRATE]
+
+def extract_audio(video_path, audio_path, on_progress=None):
+    """
+    Extract the audio of a video for transcription
+    
+    Audio in a codec the transcriber accepts is copied without re-encoding, in the
+    matching container; anything else is downmixed to low-rate mono MP3, which is
+    all speech recognition needs. The extension of ``audio_path`` is replaced to
+    match.
+    
+    Args:
+        video_path: Path to the input video
+        audio_path: Path of the extracted audio, without regard to its extension
+        on_progress: Optional callback receiving the completed fraction
+        
+    Returns:
+        Path of the extracted audio
+    """
+    try:
+        logger.info(f"Extracting audio from {video_path}")
+        audio_stream = probe_audio_stream(video_path)
+        if audio_stream is None:
+            raise ValueError(f"{video_path} has no audio track")
+        codec = audio_stream.get("codec_name")
+        base_path = os.path.splitext(audio_path)[0]
+        if codec in TRANSCRIBABLE_CODECS:
+            audio_path = base_path + TRANSCRIBABLE_CODECS[codec]
+            codec_args = ["-c:a", "copy"]
+        else:
+            audio_path = base_path + ".mp3"
+            codec_args = ["-ac", "1", "-ar", "16000", "-c:a", "libmp3lame", "-b:a", "64k"]
+        with stage("extract_audio") as span:
+            ffmpeg_manager.run(
+                ["-y", "-loglevel", "error", "-i", video_path, "-map", "0:a:0", "-vn", *codec_args, audio_path],
+                duration=probe_duration(video_path) if on_progress else None, on_progress=on_progress,
+                outputs=[audio_path]
+            )
+            span.add_bytes(os.path.getsize(audio_path))
+        logger.info(f"Audio ({codec}) {'copied' if codec in TRANSCRIBABLE_CODECS else 'downmixed'} to {audio_path}")
+        return audio_path
+    except subprocess.SubprocessError as e:
+        logger.error(f"Error extracting audio: {str(e)}")
+        raise
+
+def transcribe_audio(audio_path, openai_api_key=None, backend=None):
+    """Transcribe audio using OpenAI Whisper API (latest openai>=1.x) or a local Whisper model"""
+    return transcribe_audio_segments(audio_path, openai_api_key, backend)["text"]
+
+
+def transcribe_audio_segments(audio_path, openai_api_key=None, backend=None):
+    """
+    Transcribe audio as silence-aligned chunks in parallel
+    
+    Args:
+        audio_path: Path to the audio file
+        openai_api_key: OpenAI API key (optional, will use env var if not provided)
+        backend: Transcription backend name, "openai" or "local" (default: TRANSCRIPTION_BACKEND)
+        
+    Returns:
+        Dictionary with the full "text" and timestamped "segments"
+    """
+    try:
+        logger.info(f"Transcribing audio from {audio_path}")
+        
+        if (backend or TRANSCRIPTION_BACKEND) == "openai" and not openai_api_key:
+            openai_api_key = os.getenv("OPENAI_API_KEY")
+            if not openai_api_key:
+                raise ValueError("OPENAI_API_KEY not provided and not found in environment")
+        
+        with stage("transcribe_audio") as span:
+            span.add_bytes(os.path.getsize(audio_path))
+            transcript = transcribe_in_chunks(audio_path, get_transcription_backend(backend, openai_api_key))
+        
+        logger.info(f"Transcription completed: {transcript['text'][:50]}...")
+        return transcript
+    
+    except Exception as e:
+        logger.error(f"Error transcribing audio: {str(e)}")
+        raise
+
+
+def translate_text(text, target_language):
+    """Translate text to target language"""
+    try:
+        logger.info(f"Translating text to {target_language}")
+        # Translate paragraph by paragraph so long transcripts are split into batches
+        paragraphs = text.split("\n")
+        with stage("translate_text"):
+            translated_text = "\n".join(translate_texts(paragraphs, target_language))
+        logger.info(f"Translation completed: {translated_text[:50]}...")
+        return translated_text
+    except Exception as e:
+        logger.error(f"Error translating text: {str(e)}")
+        raise
+
+def text_to_speech(text, lang, output_audio):
+    """Convert text to speech"""
+    try:
+        logger.info(f"Converting text to speech in {lang}")
+        # Reuse an earlier identical segment from the shared audio cache
+        cache_key = audio_cache_key("gtts", text, language=lang)
+        
+        def synthesize(path):
+            with stage("text_to_speech") as span:
+                gTTS(text, lang=lang).save(path)
+                span.add_bytes(os.path.getsize(path))
+        
+        cached_path = audio_cache.get_or_create(cache_key, ".mp3", synthesize)
+        link_file(cached_path, output_audio)
+        logger.info(f"Speech saved to {output_audio}")
+    except Exception as e:
+        logger.error(f"Error converting text to speech: {str(e)}")
+        raise
+
+def dub_segments(segments, target_language, total_duration, work_dir, output_audio, max_workers=None):
+    """
+    Build a dubbed audio track that keeps the timing of the original speech
+    
+    All segments are translated in batches, then synthesized independently and in
+    parallel, fitted to its original slot (from its start to the start of the next
+    segment, sped up if needed) and mixed into one track of the original length.
+    
+    Args:
+        segments: Timestamped transcript segments ("start", "end", "text")
+        target_language: Target language code
+        total_duration: Length of the output track in seconds
+        work_dir: Directory for intermediate segment audio
+        output_audio: Path of the dubbed track
+        max_workers: Segments processed in parallel (default: DUB_CONCURRENCY)
+        
+    Returns:
+        List of translated segments ("start", "end", "text", "tempo")
+    """
+    try:
+        logger.info(f"Dubbing {len(segments)} segments into {target_language}")
+        segment_dir = os.path.join(work_dir, "segments")
+        os.makedirs(segment_dir, exist_ok=True)
+        
+        # Translate all segments up front in batches, reusing the translation memory
+        with stage("translate_text"):
+            translations = translate_texts([segment["text"] for segment in segments], target_language)
+        
+        def dub(index):
+            segment = segments[index]
+            next_start = segments[index + 1]["start"] if index + 1 < len(segments) else total_duration
+            slot = max(next_start - segment["start"], segment["end"] - segment["start"])
+            translated = translations[index].strip()
+            if not translated:
+                return None
+            speech_path = os.path.join(segment_dir, f"segment_{index}.mp3")
+            fitted_path = os.path.join(segment_dir, f"segment_{index}.wav")
+            text_to_speech(translated, target_language, speech_path)
+            with stage("dub_fit"):
+                tempo = fit_audio_to_slot(speech_path, slot, fitted_path, MAX_DUB_TEMPO)
+            return {"start": segment["start"], "end": segment["end"], "text": translated,
+                    "tempo": round(tempo, 3), "path": fitted_path}
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_workers or DUB_CONCURRENCY), thread_name_prefix="dub") as executor:
+            dubbed = [result for result in executor.map(bind_context(dub), range(len(segments))) if result]
+        
+        with stage("dub_mix"):
+            mix_audio_at_offsets([(d["path"], d["start"]) for d in dubbed], total_duration, output_audio)
+        shutil.rmtree(segment_dir, ignore_errors=True)
+        logger.info(f"Dubbed track saved to {output_audio}")
+        return [{key: d[key] for key in ("start", "end", "text", "tempo")} for d in dubbed]
+    except Exception as e:
+        logger.error(f"Error dubbing segments: {str(e)}")
+        raise
+
+def replace_audio(video_path, new_audio_path, output_video, on_progress=None):
+    """
+    Replace the audio in a video with a new audio track
+    
+    The video stream is copied; the new track, normally lossless PCM, is encoded
+    once into the container's audio codec.
+    
+    Args:
+        video_path: Path to the input video
+        new_audio_path: Audio track to put in the video
+        output_video: Path of the output video
+        on_progress: Optional callback receiving the completed fraction
+    """
+    try:
+        logger.info(f"Replacing audio in {video_path}")
+        # The dubbed track spans the whole video, so the video is never truncated
+        with stage("replace_audio") as span:
+            ffmpeg_manager.run(
+                ["-y", "-loglevel", "error", "-i", video_path, "-i", new_audio_path,
+                 "-map", "0:v:0", "-map", "1:a:0", "-c:v", "copy", *DUB_AUDIO_ARGS,
+                 "-movflags", "+faststart", output_video],
+                duration=probe_duration(video_path) if on_progress else None, on_progress=on_progress,
+                outputs=[output_video]
+            )
+            span.add_bytes(os.path.getsize(output_video))
+        logger.info(f"Video with replaced audio saved to {output_video}")
+    except subprocess.SubprocessError as e:
+        logger.error(f"Error replacing audio: {str(e)}")
+        raise
+
+def dub_language(video_path, segments, target_language, total_duration, work_dir, translation_dir):
+    """
+    Produce the dubbed audio and video for one target language
+    
+    Args:
+        video_path: Path to the input video
+        segments: Timestamped transcript segments of the original audio
+        target_language: Target language code
+        total_duration: Length of the video in seconds
+        work_dir: Working directory for intermediate files
+        translation_dir: Artifact store directory of the translation
+        
+    Returns:
+        Manifest entry with the output paths and URLs for the language
+    """
+    language_work_dir = os.path.join(work_dir, target_language)
+    os.makedirs(language_work_dir, exist_ok=True)
+    
+    # Outputs are written once, straight into the artifact store
+    translated_audio = artifact_store.path(translation_dir, target_language, "translated_audio.m4a")
+    output_video_path = artifact_store.path(translation_dir, target_language, "translated_video.mp4")
+    
+    # Translate and synthesize each segment in its original time slot, mixed as lossless PCM
+    dubbed_track = os.path.join(language_work_dir, "dubbed_audio.wav")
+    dubbed = dub_segments(segments, target_language, total_duration, language_work_dir, dubbed_track)
+    
+    # Encode the dubbed track once, into the video; the standalone audio is a copy of that stream
+    replace_audio(video_path, dubbed_track, output_video_path)
+    with stage("copy_audio"):
+        copy_audio_stream(output_video_path, translated_audio)
+    
+    owner = os.path.basename(translation_dir)
+    artifact_store.register(translated_audio, owner)
+    artifact_store.register(output_video_path, owner)
+    
+    return {
+        "status": "completed",
+        "output_path": output_video_path,
+        "translated_audio": translated_audio,
+        "segments": len(dubbed),
+        "frontend_paths": {
+            "video": artifact_store.url(output_video_path),
+            "translated_audio": artifact_store.url(translated_audio)
+        }
+    }
+
+def process_video_languages(video_path, target_languages, openai_api_key=None, max_workers=None):
+    """
+    Translate a video into several languages, extracting and transcribing its audio once
+    
+    Translation, speech synthesis and muxing then run in parallel per language.
+    A language that fails is reported in the manifest without failing the others.
+    
+    Args:
+        video_path: Path to the input video
+        target_languages: Target language codes (e.g., ['es', 'fr', 'hi'])
+        openai_api_key: OpenAI API key (optional, will use env var if not provided)
+        max_workers: Languages processed in parallel (default: LANGUAGE_CONCURRENCY)
+        
+    Returns:
+        Manifest with the shared outputs and a "languages" entry per target language
+    """
+    # Unique working directory for the intermediates of this translation
+    timestamp = os.path.basename(video_path).split('.')[0]
+    work_dir = os.path.join(OUTPUT_DIR, f"translation_{timestamp}")
+    translation_dir = os.path.join("temp_translations", f"translation_{timestamp}")
+    try:
+        logger.info(f"Processing video: {video_path} to {', '.join(target_languages)}")
+        os.makedirs(work_dir, exist_ok=True)
+        
+        # Extract and transcribe the audio once for all languages
+        original_audio = extract_audio(video_path, artifact_store.path(translation_dir, "original_audio"))
+        transcript = transcribe_audio_segments(original_audio, openai_api_key)
+        total_duration = probe_duration(video_path)
+        artifact_store.register(original_audio, os.path.basename(translation_dir))
+        
+        def run(target_language):
+            try:
+                return dub_language(video_path, transcript["segments"], target_language, total_duration,
+                                    work_dir, translation_dir)
+            except Exception as e:
+                logger.error(f"Error translating video to {target_language}: {str(e)}")
+                return {"status": "failed", "error": str(e)}
+        
+        workers = max(1, min(max_workers or LANGUAGE_CONCURRENCY, len(target_languages)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="language") as executor:
+            languages = dict(zip(target_languages, executor.map(bind_context(run), target_languages)))
+        
+        if all(entry["status"] == "failed" for entry in languages.values()):
+            raise RuntimeError("; ".join(f"{lang}: {entry['error']}" for lang, entry in languages.items()))
+        
+        return {
+            "original_audio": original_audio,
+            "transcript": transcript["text"],
+            "frontend_paths": {"original_audio": artifact_store.url(original_audio)},
+            "languages": languages
+        }
+    except Exception as e:
+        logger.error(f"Error processing video: {str(e)}")
+        raise
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        # Clean up the temporary video file
+        if os.path.exists(video_path):
+            os.remove(video_path)
+            logger.info(f"Removed temporary video file: {video_path}")
+
+def process_video(video_path, target_language, openai_api_key=None):
+    """
+    Process a video by translating its audio to the target language
+    
+    Args:
+        video_path: Path to the input video
+        target_language: Target language code (e.g., 'es', 'fr', 'hi')
+        openai_api_key: OpenAI API key (optional, will use env var if not provided)
+        
+    Returns:
+        Dictionary with paths to the output files
+    """
+    manifest = process_video_languages(video_path, [target_language], openai_api_key)
+    result = manifest["languages"][target_language]
+    if result["status"] == "failed":
+        raise RuntimeError(result["error"])
+    return {
+        "output_path": result["output_path"],
+        "original_audio": manifest["original_audio"],
+        "translated_audio": result["translated_audio"],
+        "frontend_paths": {
+            "video": result["frontend_paths"]["video"],
+            "original_audio": manifest["frontend_paths"]["original_audio"],
+            "translated_audio": result["frontend_paths"]["translated_audio"]
+        }
+    }
@@ -0,0 +1,258 @@
+"""
+Deterministic local stand-ins for the OpenAI client, Google Translate and gTTS, plus synthetic media
+
+Used by the offline benchmarks so the pipelines run without network access or
+API keys. Every fake call waits a configurable latency (with seeded jitter) and
+fails with a configurable probability; media is generated locally with ffmpeg.
+"""
+import os
+import json
+import random
+import shutil
+import hashlib
+import threading
+import subprocess
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+
+class FakeServiceError(Exception):
+    """Failure injected into a fake service call"""
+
+
+class FaultInjector:
+    """Adds latency and random failures to fake service calls, reproducibly for a given seed"""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.calls = Counter()
+        self.failures = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, name: str, scale: float = 1.0):
+        with self._lock:
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter)) * scale
+            fail = self._random.random() < self.failure_rate
+            self.calls[name] += 1
+            if fail:
+                self.failures[name] += 1
+        time.sleep(delay)
+        if fail:
+            raise FakeServiceError(f"Injected failure in {name}")
+
+    def stats(self):
+        with self._lock:
+            return {"calls": dict(self.calls), "failures": dict(self.failures)}
+
+
+# Synthetic media
+
+def _ffmpeg(*args: str):
+    subprocess.run(["ffmpeg", "-y", "-loglevel", "error", *args], check=True)
+
+
+def synthetic_image(path: str, size: str = "1792x1024"):
+    """Write a PNG test pattern of the given WxH size"""
+    _ffmpeg("-f", "lavfi", "-i", f"testsrc2=size={size}:rate=1", "-frames:v", "1", path)
+
+
+def synthetic_speech(path: str, seconds: float, frequency: int = 440):
+    """Write a mono MP3 tone standing in for synthesized speech"""
+    _ffmpeg("-f", "lavfi", "-i", f"sine=frequency={frequency}:duration={seconds:.2f}",
+            "-ac", "1", "-ar", "24000", "-b:a", "48k", path)
+
+
+def synthetic_video(path: str, seconds: float, size: str = "1280x720"):
+    """
+    Write an H.264/AAC test video whose audio alternates 3 seconds of tone with
+    1 second of silence, so silence detection and segment timing are exercised
+    """
+    _ffmpeg("-f", "lavfi", "-i", f"testsrc2=size={size}:rate=25:duration={seconds:.2f}",
+            "-f", "lavfi", "-i", f"aevalsrc=0.5*sin(2*PI*440*t)*lt(mod(t\\,4)\\,3):s=44100:d={seconds:.2f}",
+            "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", path)
+
+
+class MediaLibrary:
+    """Generates each synthetic asset once and hands out its path"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _get(self, name: str, producer):
+        path = os.path.join(self.root, name)
+        with self._lock:
+            if not os.path.exists(path):
+                producer(path)
+        return path
+
+    def image(self, size: str) -> str:
+        return self._get(f"image_{size}.png", lambda path: synthetic_image(path, size))
+
+    def speech(self, seconds: float) -> str:
+        # Half-second buckets keep the number of distinct files small
+        seconds = max(1.0, round(seconds * 2) / 2)
+        return self._get(f"speech_{seconds:.1f}.mp3", lambda path: synthetic_speech(path, seconds))
+
+
+def speech_seconds(text: str) -> float:
+    """Approximate speaking time of a text at about 2.5 words per second"""
+    return max(1.0, len(text.split()) / 2.5)
+
+
+# Fake OpenAI client
+
+def fake_story(prompt: str, num_scenes: int) -> dict:
+    """Return a deterministic story in the shape the story tool call produces"""
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+    return {
+        "title": f"Benchmark story {digest}",
+        "theme": "benchmarking",
+        "scenes": [
+            {
+                "title": f"Scene {i}",
+                "description": f"Scene {i} of the benchmark story about {prompt}",
+                "media": {
+                    "image_prompt": f"A detailed illustration of scene {i} about {prompt}",
+                    "audio_narration": " ".join(["This is the narration of a benchmark scene."] * 3),
+                },
+            }
+            for i in range(1, num_scenes + 1)
+        ],
+    }
+
+
+class _FakeImages:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def generate(self, model, prompt, size="1024x1024", quality="standard", n=1, timeout=None):
+        self._owner.faults("images.generate")
+        path = self._owner.media.image(size)
+        return SimpleNamespace(data=[SimpleNamespace(url=f"fake://{path}")])
+
+
+class _FakeSpeech:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, model, voice, input, speed=1.0, timeout=None):
+        self._owner.faults("audio.speech.create")
+        with open(self._owner.media.speech(speech_seconds(input) / speed), "rb") as speech_file:
+            data = speech_file.read()
+        return SimpleNamespace(iter_bytes=lambda: iter([data]))
+
+
+class _FakeTranscriptions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, model, file, response_format="json"):
+        from app.media import probe_duration
+
+        duration = probe_duration(file.name)
+        # Scale the latency with the audio length, like the real API
+        self._owner.faults("audio.transcriptions.create", scale=max(1.0, duration / 60))
+        segments = [
+            {"start": float(start), "end": float(min(start + 3, duration)),
+             "text": f"This is benchmark sentence number {start // 4 + 1}."}
+            for start in range(0, int(duration), 4)
+        ]
+        return SimpleNamespace(text=" ".join(s["text"] for s in segments), duration=duration, segments=segments)
+
+
+class _FakeCompletions:
+    def __init__(self, owner):
+        self._owner = owner
+
+    def create(self, model, messages, tools=None, tool_choice=None, temperature=None, max_tokens=None, stream=False):
+        user_prompt = messages[-1]["content"]
+        num_scenes = 3
+        words = user_prompt.split()
+        if "approximately" in words:
+            try:
+                num_scenes = int(words[words.index("approximately") + 1])
+            except (IndexError, ValueError):
+                pass
+        arguments = json.dumps(fake_story(user_prompt, num_scenes))
+        if not stream:
+            self._owner.faults("chat.completions.create", scale=3)
+            tool_call = SimpleNamespace(function=SimpleNamespace(arguments=arguments))
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(tool_calls=[tool_call]))])
+        return self._stream(arguments)
+
+    def _stream(self, arguments, chunk_size=64):
+        # Spread the same total latency as a non-streamed call over the chunks
+        self._owner.faults("chat.completions.create")
+        chunks = [arguments[i:i + chunk_size] for i in range(0, len(arguments), chunk_size)]
+        for fragment in chunks:
+            time.sleep(2 * self._owner.faults.latency / len(chunks))
+            tool_call = SimpleNamespace(function=SimpleNamespace(arguments=fragment))
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(tool_calls=[tool_call]))])
+
+
+class FakeOpenAI:
+    """Stand-in for the OpenAI client covering the calls made by the pipelines"""
+
+    def __init__(self, faults: FaultInjector, media: MediaLibrary):
+        self.faults = faults
+        self.media = media
+        self.images = _FakeImages(self)
+        self.audio = SimpleNamespace(speech=_FakeSpeech(self), transcriptions=_FakeTranscriptions(self))
+        self.chat = SimpleNamespace(completions=_FakeCompletions(self))
+
+
+class FakeTranslationBackend:
+    """Translation backend that tags texts with the target language"""
+
+    name = "fake"
+
+    def __init__(self, faults: FaultInjector):
+        self.faults = faults
+
+    def translate_batch(self, texts, source, target):
+        self.faults("translate_batch")
+        return [f"[{target}] {text}" for text in texts]
+
+
+def fake_gtts_class(faults: FaultInjector, media: MediaLibrary):
+    """Return a gTTS replacement class that writes synthetic speech"""
+
+    class FakeGTTS:
+        def __init__(self, text, lang="en"):
+            self.text = text
+
+        def save(self, path):
+            faults("gtts")
+            shutil.copyfile(media.speech(speech_seconds(self.text)), path)
+
+    return FakeGTTS
+
+
+def install_fakes(faults: FaultInjector, media: MediaLibrary) -> FakeOpenAI:
+    """
+    Route the application's OpenAI, download, translation and gTTS calls to the fakes
+
+    Must be called after the application modules are imported.
+    """
+    from app import translation, video_trans
+    from app.clients import clients
+
+    fake_client = FakeOpenAI(faults, media)
+
+    def download_to(url, path, timeout=None, chunk_size=1024 * 1024):
+        faults("download")
+        shutil.copyfile(url[len("fake://"):], path)
+        return os.path.getsize(path)
+
+    clients.openai = lambda api_key=None: fake_client
+    clients.download_to = download_to
+    translation.TRANSLATION_BACKENDS["fake"] = lambda: FakeTranslationBackend(faults)
+    translation.TRANSLATION_BACKEND = "fake"
+    video_trans.gTTS = fake_gtts_class(faults, media)
+    return fake_client
@@ -0,0 +1,377 @@
+"""
+Measure the video generation and translation pipelines offline, end to end
+
+OpenAI, Google Translate and gTTS are replaced by local fakes (benchmarks.fakes)
+with configurable latency and failure injection, and all media is synthesized
+with ffmpeg, so runs need no network access or API keys and are comparable
+across commits. Everything is written to a temporary working directory.
+
+Usage (from the repository root):
+    python -m benchmarks.pipeline_benchmark --scenarios generate_video process_video endpoints \\
+        --iterations 8 --concurrency 2 --latency-ms 200 --output pipeline.json
+    python -m benchmarks.pipeline_benchmark --compare pipeline.json
+
+Scenarios:
+    generate_video  generate_video_from_prompt with a new prompt per iteration
+    process_video   process_video_languages on a synthetic video
+    endpoints       /login, /video_generation (polling /jobs) and /video_translation
+                    through the FastAPI app
+    login_under_load
+                    /login latency while --concurrency clients keep generating
+                    images, rendering videos and translating videos, compared with
+                    /login latency on an idle server
+
+Writes a JSON report with, per scenario, throughput, p50/p95/p99 latency,
+errors, CPU time of the process and its ffmpeg children, peak RSS, the stage
+summary and the fake service calls. With --compare, the relative change of the
+main figures against an earlier report is added.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import platform
+import tempfile
+import subprocess
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.fakes import FaultInjector, MediaLibrary, install_fakes, synthetic_video
+
+SCENARIOS = ("generate_video", "process_video", "endpoints", "login_under_load")
+
+
+def prepare_environment(work_dir: str):
+    """Point every output and cache location of the app at the working directory"""
+    os.environ.update({
+        "CACHE_DIR": os.path.join(work_dir, "cache"),
+        "ARTIFACT_ROOT": os.path.join(work_dir, "artifacts"),
+        "PROJECTS_DIR": os.path.join(work_dir, "projects"),
+        "STORIES_DIR": os.path.join(work_dir, "stories"),
+        "OPENAI_API_KEY": "offline-benchmark",
+        "TRANSCRIPTION_BACKEND": "openai",
+        "ARTIFACT_SWEEP_INTERVAL": "0",
+    })
+    os.chdir(work_dir)
+
+
+def percentile(values, fraction: float) -> float:
+    """Return a percentile of the values with linear interpolation"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_scenario(name: str, iteration, iterations: int, concurrency: int, faults: FaultInjector) -> dict:
+    """Run ``iteration(i)`` for every i with the given concurrency and summarize the runs"""
+    from app.metrics import record_stages, bind_context
+
+    def timed(index):
+        start = time.perf_counter()
+        try:
+            iteration(index)
+            return time.perf_counter() - start, None
+        except Exception as e:
+            return time.perf_counter() - start, f"{type(e).__name__}: {e}"
+
+    calls_before = faults.stats()
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.perf_counter()
+    with record_stages() as recorder:
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="benchmark") as executor:
+            results = list(executor.map(bind_context(timed), range(iterations)))
+    wall = time.perf_counter() - start
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    calls_after = faults.stats()
+
+    latencies = [seconds for seconds, error in results if error is None]
+    errors = [error for _, error in results if error is not None]
+    return {
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "succeeded": len(latencies),
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "wall_seconds": round(wall, 3),
+        "throughput_per_second": round(len(latencies) / wall, 4) if wall else None,
+        "latency_seconds": latency_summary(latencies),
+        "cpu_seconds": {
+            "user": round(usage.ru_utime - usage_before.ru_utime, 3),
+            "system": round(usage.ru_stime - usage_before.ru_stime, 3),
+            "children_user": round(children.ru_utime - children_before.ru_utime, 3),
+            "children_system": round(children.ru_stime - children_before.ru_stime, 3),
+        },
+        # ru_maxrss is a high-water mark for the whole run so far, in KiB on Linux
+        "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),
+        "children_peak_rss_mb": round(children.ru_maxrss / 1024, 1),
+        "stages": recorder.summary(),
+        "fake_calls": _difference(calls_after["calls"], calls_before["calls"]),
+        "fake_failures": _difference(calls_after["failures"], calls_before["failures"]),
+    }
+
+
+def _round(value):
+    return round(value, 4) if value is not None else None
+
+
+def _difference(after: dict, before: dict) -> dict:
+    return {name: count - before.get(name, 0) for name, count in after.items() if count - before.get(name, 0)}
+
+
+def generate_video_iteration(args):
+    from app.video_gen import generate_video_from_prompt
+
+    def iteration(index):
+        # A new prompt per iteration keeps the story and asset caches cold unless --warm
+        prompt = "benchmark prompt" if args.warm else f"benchmark prompt {uuid.uuid4().hex}"
+        generate_video_from_prompt(prompt=prompt, render_engine=args.render_engine, resolution=args.resolution)
+
+    return iteration
+
+
+def process_video_iteration(args, fixture: str):
+    from app.video_trans import process_video_languages
+
+    def iteration(index):
+        # The pipeline deletes its input video, so each run gets its own copy
+        video_path = f"temp_video_{uuid.uuid4().hex}.mp4"
+        shutil.copyfile(fixture, video_path)
+        manifest = process_video_languages(video_path, args.languages)
+        failed = [language for language, entry in manifest["languages"].items() if entry["status"] == "failed"]
+        if failed:
+            raise RuntimeError(f"Translation failed for {', '.join(failed)}")
+
+    return iteration
+
+
+def login(client) -> dict:
+    """Log in as the default user and return the authorization header"""
+    response = client.post("/login", data={"username": "admin", "password": "admin123"})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def endpoints_iteration(args, client, fixture: str):
+    def iteration(index):
+        headers = login(client)
+
+        # Queue a video and poll the job until it finishes
+        prompt = "benchmark prompt" if args.warm else f"benchmark prompt {uuid.uuid4().hex}"
+        response = client.post("/video_generation", headers=headers, json={
+            "prompt": prompt, "render_engine": args.render_engine, "resolution": args.resolution
+        })
+        response.raise_for_status()
+        status_url = response.json()["status_url"]
+        while True:
+            job = client.get(status_url, headers=headers).json()
+            if job["status"] in ("completed", "failed"):
+                break
+            time.sleep(0.1)
+        if job["status"] == "failed":
+            raise RuntimeError(job.get("error"))
+
+        # Upload the synthetic video for translation
+        with open(fixture, "rb") as video_file:
+            response = client.post(
+                "/video_translation", headers=headers,
+                files={"video_file": ("benchmark.mp4", video_file, "video/mp4")},
+                data={"target_languages": args.languages}
+            )
+        response.raise_for_status()
+
+    return iteration
+
+
+def login_latencies(client, samples: int, interval: float = 0.05) -> list:
+    """Time sequential /login requests"""
+    latencies = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        login(client)
+        latencies.append(time.perf_counter() - start)
+        time.sleep(interval)
+    return latencies
+
+
+def latency_summary(latencies: list) -> dict:
+    """Return the mean, p50, p95, p99 and maximum of latencies in seconds"""
+    return {
+        "mean": _round(sum(latencies) / len(latencies)) if latencies else None,
+        "p50": _round(percentile(latencies, 0.50)),
+        "p95": _round(percentile(latencies, 0.95)),
+        "p99": _round(percentile(latencies, 0.99)),
+        "max": _round(max(latencies, default=None)),
+    }
+
+
+def login_under_load(args, client, fixture: str) -> dict:
+    """Measure /login latency on an idle server, then while background clients keep the pipelines busy"""
+    idle = latency_summary(login_latencies(client, args.login_samples))
+
+    load_iteration = endpoints_iteration(args, client, fixture)
+    stop = threading.Event()
+    completed, errors = [], []
+
+    def load(worker):
+        headers = login(client)
+        while not stop.is_set():
+            try:
+                client.post("/image_generation", headers=headers,
+                            json={"prompt": f"benchmark image {uuid.uuid4().hex}"}).raise_for_status()
+                load_iteration(worker)
+                completed.append(worker)
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+
+    with ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="load") as executor:
+        for worker in range(args.concurrency):
+            executor.submit(load, worker)
+        # Let the load ramp up before sampling
+        time.sleep(1.0)
+        start = time.perf_counter()
+        loaded = login_latencies(client, args.login_samples)
+        wall = time.perf_counter() - start
+        stop.set()
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    summary = latency_summary(loaded)
+    return {
+        "samples": args.login_samples,
+        "concurrency": args.concurrency,
+        "idle_latency_seconds": idle,
+        "latency_seconds": summary,
+        "throughput_per_second": round(len(loaded) / wall, 4) if wall else None,
+        "p95_slowdown": round(summary["p95"] / idle["p95"], 2) if idle["p95"] else None,
+        "background_iterations": len(completed),
+        "background_errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),
+    }
+
+
+def benchmark_scenario(name: str, args, app, fixture: str, faults: FaultInjector) -> dict:
+    if name == "generate_video":
+        return run_scenario(name, generate_video_iteration(args), args.iterations, args.concurrency, faults)
+    if name == "process_video":
+        return run_scenario(name, process_video_iteration(args, fixture), args.iterations, args.concurrency, faults)
+
+    from fastapi.testclient import TestClient
+
+    # Entering the client runs the app's startup and shutdown handlers
+    with TestClient(app) as client:
+        if name == "login_under_load":
+            return login_under_load(args, client, fixture)
+        return run_scenario(name, endpoints_iteration(args, client, fixture), args.iterations, args.concurrency,
+                            faults)
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    """Return the relative change of throughput and latency percentiles against a baseline report"""
+    comparison = {"baseline_commit": baseline.get("commit")}
+    for name, current in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        figures = {"throughput_per_second": (current["throughput_per_second"], previous["throughput_per_second"])}
+        for key in ("p50", "p95", "p99"):
+            figures[f"latency_{key}"] = (current["latency_seconds"][key], previous["latency_seconds"][key])
+        figures["peak_rss_mb"] = (current["peak_rss_mb"], previous["peak_rss_mb"])
+        comparison[name] = {
+            key: {"current": now, "baseline": then,
+                  "change": round((now - then) / then, 4) if now is not None and then else None}
+            for key, (now, then) in figures.items()
+        }
+    return comparison
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=SCENARIOS)
+    parser.add_argument("--iterations", type=int, default=4, help="Runs per scenario")
+    parser.add_argument("--concurrency", type=int, default=2, help="Runs in flight at once")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Latency of each fake service call")
+    parser.add_argument("--jitter-ms", type=float, default=50, help="Random variation of the fake latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Probability of a fake call failing")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the latency and failure injection")
+    parser.add_argument("--languages", nargs="+", default=["es", "fr"], help="Target languages of translations")
+    parser.add_argument("--video-seconds", type=float, default=20, help="Length of the synthetic input video")
+    parser.add_argument("--render-engine", choices=["ffmpeg", "ffmpeg_segments", "moviepy"], default=None)
+    parser.add_argument("--resolution", choices=["720p", "1080p", "vertical"], default="720p")
+    parser.add_argument("--login-samples", type=int, default=50, help="/login requests timed by login_under_load")
+    parser.add_argument("--warm", action="store_true", help="Repeat the same prompt so caches are hit")
+    parser.add_argument("--work-dir", help="Working directory (default: a temporary directory, removed afterwards)")
+    parser.add_argument("--compare", help="Earlier JSON report to compare against")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    if args.output:
+        args.output = os.path.abspath(args.output)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    work_dir = os.path.abspath(args.work_dir or tempfile.mkdtemp(prefix="pipeline_benchmark_"))
+    os.makedirs(work_dir, exist_ok=True)
+    initial_dir = os.getcwd()
+    prepare_environment(work_dir)
+    try:
+        faults = FaultInjector(args.latency_ms / 1000, args.jitter_ms / 1000, args.failure_rate, args.seed)
+        media = MediaLibrary(os.path.join(work_dir, "fixtures"))
+        fixture = os.path.join(media.root, "input.mp4")
+        synthetic_video(fixture, args.video_seconds)
+
+        # Import the app only now, so its modules pick up the environment above
+        from app.main import app
+        install_fakes(faults, media)
+
+        report = {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "work_dir")},
+            "scenarios": {},
+        }
+        for name in args.scenarios:
+            report["scenarios"][name] = benchmark_scenario(name, args, app, fixture, faults)
+    finally:
+        os.chdir(initial_dir)
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if baseline is not None:
+        report["comparison"] = compare(report, baseline)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as report_file:
+            report_file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
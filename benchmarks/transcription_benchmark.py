@@ -0,0 +1,67 @@
+"""
+Compare transcription throughput of the remote whisper-1 API and the local Whisper pool
+
+Usage (from the repository root):
+    python -m benchmarks.transcription_benchmark sample.mp3 --backends openai local --repeat 3
+
+Writes a JSON report with, per backend, the model load time, wall time per run
+and throughput as seconds of audio transcribed per second of wall time.
+"""
+import sys
+import json
+import time
+import argparse
+import statistics
+
+from app.media import probe_duration
+from app.transcription import get_transcription_backend, transcribe_in_chunks
+
+
+def benchmark_backend(name: str, audio_path: str, audio_seconds: float, repeat: int) -> dict:
+    load_start = time.perf_counter()
+    backend = get_transcription_backend(name)
+    load_seconds = time.perf_counter() - load_start
+
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        transcript = transcribe_in_chunks(audio_path, backend)
+        runs.append(time.perf_counter() - start)
+
+    median = statistics.median(runs)
+    return {
+        "backend": name,
+        "load_seconds": round(load_seconds, 3),
+        "runs_seconds": [round(run, 3) for run in runs],
+        "median_seconds": round(median, 3),
+        "audio_seconds_per_second": round(audio_seconds / median, 3) if median else None,
+        "segments": len(transcript["segments"]),
+        "characters": len(transcript["text"]),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("audio_path", help="Audio file to transcribe")
+    parser.add_argument("--backends", nargs="+", default=["openai", "local"], choices=["openai", "local"])
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per backend")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    audio_seconds = probe_duration(args.audio_path)
+    report = {
+        "audio_path": args.audio_path,
+        "audio_seconds": round(audio_seconds, 3),
+        "results": [benchmark_backend(name, args.audio_path, audio_seconds, args.repeat) for name in args.backends],
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as report_file:
+            report_file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
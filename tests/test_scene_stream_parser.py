@@ -0,0 +1,49 @@
+import os
+import json
+
+import pytest
+
+from app.video_gen import SceneStreamParser
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "story_stream.json")
+
+
+@pytest.fixture
+def fragments():
+    # Tool-call argument fragments of a streamed story completion, in arrival order
+    with open(FIXTURE_PATH, encoding="utf-8") as fixture:
+        return json.load(fixture)["tool_call_argument_fragments"]
+
+
+def replay(fragments):
+    """Feed fragments to a parser and return (fragment index, scene) for every emitted scene"""
+    parser = SceneStreamParser()
+    emitted = []
+    for index, fragment in enumerate(fragments):
+        emitted.extend((index, scene) for scene in parser.feed(fragment))
+    assert parser.scene_count == len(emitted)
+    return emitted
+
+
+def test_replayed_stream_emits_every_scene_in_order(fragments):
+    expected = json.loads("".join(fragments))["scenes"]
+    assert [scene for _, scene in replay(fragments)] == expected
+
+
+def test_scenes_are_emitted_as_soon_as_they_are_complete(fragments):
+    arguments = "".join(fragments)
+    # Fed one character at a time, each scene is emitted on its closing brace
+    emitted = replay(list(arguments))
+    assert all(arguments[index] == "}" for index, _ in emitted)
+    # The metadata after the scenes array is still streaming when the last scene is handed out
+    indices = [index for index, _ in replay(fragments)]
+    assert indices == sorted(set(indices))
+    assert indices[-1] < len(fragments) - 1
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 100000])
+def test_scenes_do_not_depend_on_how_the_stream_is_split(fragments, chunk_size):
+    arguments = "".join(fragments)
+    chunks = [arguments[i:i + chunk_size] for i in range(0, len(arguments), chunk_size)]
+    expected = json.loads(arguments)["scenes"]
+    assert [scene for _, scene in replay(chunks)] == expected